@@ -0,0 +1,261 @@
+# Local stand-ins for the OpenAI chat completions API and for DuckDuckGo image
+# search, replaying the sample outputs so the app can be load tested offline.
+#
+#   python benchmarks/fake_backends.py [--port 8765] [--llm-latency 0.5] ...
+#
+# Point the app at it with OPENAI_BASE_URL=http://127.0.0.1:8765/v1 and
+# image_search.DDGS = FakeDDGS.
+import argparse
+import io
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import urllib.parse
+import urllib.request
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.sample_outputs import (  # noqa: E402
+    SAMPLE_SLIDE_OUTPUTS,
+    SAMPLE_SUMMARIES,
+)
+
+END_OF_SLIDE = "<!END OF SLIDE>"
+STREAM_CHUNK_CHARS = 16
+SLIDE_TYPE_PATTERN = re.compile(r"Output Type: (.+?)\. Generate a slide")
+NUMBER_OF_SLIDES_PATTERN = re.compile(r"into (\d+) slides")
+IMAGE_PATTERN = re.compile(r"<IMAGE>\{?(.*?)\}?</IMAGE>", re.DOTALL)
+DOCUMENT_PATTERN = re.compile(r"Document \d+")
+
+
+def sample_summary(number_of_slides, document=None):
+    # The longest sample, cut down to the requested number of slides. The
+    # document marker from the prompt is carried into every slide, so distinct
+    # documents also get distinct slide prompts.
+    slides = max(SAMPLE_SUMMARIES, key=len).split(END_OF_SLIDE)
+    slides = [slide for slide in slides if slide.strip()][:number_of_slides]
+    prefix = f"{document}\n" if document else ""
+    return "".join(prefix + slide.strip() + END_OF_SLIDE for slide in slides)
+
+
+def sample_slide(slide_type, vary_images):
+    for sample in SAMPLE_SLIDE_OUTPUTS:
+        if sample["type"].lower() == slide_type.lower():
+            content = sample["generated_content"]
+            break
+    else:
+        content = SAMPLE_SLIDE_OUTPUTS[0]["generated_content"]
+    if vary_images:
+        # A fresh query per slide, so image lookups miss the resolver cache
+        content = IMAGE_PATTERN.sub(
+            lambda match: (
+                f"<IMAGE>{{{match.group(1)} {uuid.uuid4().hex[:8]}}}</IMAGE>"
+            ),
+            content,
+        )
+    return content
+
+
+def sample_image(size=(1600, 1200)):
+    from PIL import Image
+
+    # Noise compresses about as badly as a photo
+    image = Image.effect_noise(size, 64).convert("RGB")
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=85)
+    return buffer.getvalue()
+
+
+class FakeBackendHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _delay(self, latency):
+        if latency:
+            time.sleep(random.uniform(0.5, 1.5) * latency)
+
+    def _failed(self, error_rate):
+        if random.random() >= error_rate:
+            return False
+        self._send_json(
+            429,
+            {"error": {"message": "Rate limit reached", "type": "rate_limit"}},
+        )
+        return True
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/v1/chat/completions":
+            self._send_json(404, {"error": {"message": "Not found"}})
+            return
+
+        config = self.server.config
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self._delay(config["llm_latency"])
+        if self._failed(config["llm_error_rate"]):
+            return
+
+        prompt = "\n".join(message["content"] for message in request["messages"])
+        slide_type = SLIDE_TYPE_PATTERN.search(prompt)
+        if slide_type:
+            content = sample_slide(slide_type.group(1), config["vary_images"])
+        else:
+            number_of_slides = NUMBER_OF_SLIDES_PATTERN.search(prompt)
+            document = DOCUMENT_PATTERN.search(prompt)
+            content = sample_summary(
+                int(number_of_slides.group(1)) if number_of_slides else 5,
+                document.group(0) if document else None,
+            )
+        usage = {
+            "prompt_tokens": len(prompt) // 4,
+            "completion_tokens": len(content) // 4,
+            "total_tokens": (len(prompt) + len(content)) // 4,
+        }
+        response = {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "created": int(time.time()),
+            "model": request["model"],
+        }
+
+        if not request.get("stream"):
+            response.update(
+                object="chat.completion",
+                choices=[
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": content},
+                        "finish_reason": "stop",
+                    }
+                ],
+                usage=usage,
+            )
+            self._send_json(200, response)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        response["object"] = "chat.completion.chunk"
+        for i in range(0, len(content), STREAM_CHUNK_CHARS):
+            chunk = dict(
+                response,
+                choices=[
+                    {
+                        "index": 0,
+                        "delta": {"content": content[i : i + STREAM_CHUNK_CHARS]},
+                        "finish_reason": None,
+                    }
+                ],
+            )
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.flush()
+            if config["llm_chunk_delay"]:
+                time.sleep(config["llm_chunk_delay"])
+        if (request.get("stream_options") or {}).get("include_usage"):
+            chunk = dict(response, choices=[], usage=usage)
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+        self.wfile.write(b"data: [DONE]\n\n")
+
+    def do_GET(self):
+        config = self.server.config
+        url = urllib.parse.urlsplit(self.path)
+        if url.path == "/images/search":
+            self._delay(config["image_latency"])
+            if self._failed(config["image_error_rate"]):
+                return
+            query = urllib.parse.parse_qs(url.query).get("q", [""])[0]
+            image_id = uuid.uuid5(uuid.NAMESPACE_URL, query).hex
+            host, port = self.server.server_address[:2]
+            image_url = f"http://{host}:{port}/images/{image_id}.jpg"
+            self._send_json(200, [{"title": query, "image": image_url}])
+        elif url.path.startswith("/images/"):
+            self._delay(config["image_latency"])
+            # Trailing bytes keep every url's image distinct for the image store,
+            # decoders stop at the end-of-image marker
+            data = self.server.image + url.path.encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "image/jpeg")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        else:
+            self._send_json(404, {"error": {"message": "Not found"}})
+
+
+def make_server(
+    host="127.0.0.1",
+    port=0,
+    llm_latency=0.5,
+    llm_chunk_delay=0.005,
+    llm_error_rate=0.0,
+    image_latency=0.1,
+    image_error_rate=0.0,
+    vary_images=True,
+):
+    server = ThreadingHTTPServer((host, port), FakeBackendHandler)
+    server.daemon_threads = True
+    server.config = {
+        "llm_latency": llm_latency,
+        "llm_chunk_delay": llm_chunk_delay,
+        "llm_error_rate": llm_error_rate,
+        "image_latency": image_latency,
+        "image_error_rate": image_error_rate,
+        "vary_images": vary_images,
+    }
+    server.image = sample_image()
+    return server
+
+
+def serve(port_queue=None, **config):
+    # Entry point for running the backends in a separate process, so their
+    # work does not compete with the app for the GIL
+    server = make_server(**config)
+    if port_queue is not None:
+        port_queue.put(server.server_address[1])
+    server.serve_forever()
+
+
+def start_in_thread(**config):
+    server = make_server(**config)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class FakeDDGS:
+    # Drop-in for duckduckgo_search.DDGS that queries the fake backend
+    base_url = os.getenv("FAKE_DDGS_URL", "http://127.0.0.1:8765")
+
+    def images(self, keywords, max_results=None, **kwargs):
+        query = urllib.parse.urlencode({"q": keywords})
+        with urllib.request.urlopen(
+            f"{self.base_url}/images/search?{query}", timeout=30
+        ) as response:
+            results = json.load(response)
+        return results[:max_results]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    parser.add_argument("--llm-chunk-delay", type=float, default=0.005)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--image-latency", type=float, default=0.1)
+    parser.add_argument("--image-error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    print(f"Serving fake backends on http://{args.host}:{args.port}")
+    serve(**vars(args))
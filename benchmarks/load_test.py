@@ -0,0 +1,325 @@
+# Offline end-to-end load test. Each simulated session uploads a document,
+# summarizes it, generates its slides and fetches their images, like a user
+# going through main.py and pages/slides.py. The OpenAI API and
+# DuckDuckGo are replaced by the local fake backends in fake_backends.py, and
+# latency per stage comes from the instrumentation spans.
+#
+#   python benchmarks/load_test.py [--sessions 20] [--concurrency 5]
+#       [--mode stream|batch] [--llm-latency 0.5] [--llm-error-rate 0.05]
+#       [--max-p95 30] [--json results.json]
+#
+# Every run starts from empty caches in a temporary directory; pass
+# --shared-document to measure the cached path instead.
+import argparse
+import contextlib
+import io
+import json
+import math
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import fake_backends  # noqa: E402
+from benchmarks.sample_outputs import SAMPLE_SUMMARIES  # noqa: E402
+
+# Report order, outermost stages first
+STAGES = [
+    "session",
+    "save_uploaded_file",
+    "generate_summary",
+    "summary_llm_call",
+    "generate_slides",
+    "generate_slide",
+    "extract_content",
+    "image_wait",
+    "search_image_online",
+    "image_download",
+]
+
+
+def configure_environment(workdir, backend_url):
+    # Must run before the app modules are imported, they read these on import
+    os.chdir(workdir)
+    os.environ.update(
+        {
+            "OPENAI_API_KEY": "load-test",
+            "OPENAI_BASE_URL": f"{backend_url}/v1",
+            "RESPONSE_CACHE_DIR": os.path.join(workdir, "responses"),
+            "IMAGE_STORE_DIR": os.path.join(workdir, "images"),
+            "UPLOAD_REGISTRY_FILE": os.path.join(workdir, "upload_registry.json"),
+            "REPORTS_DIR": os.path.join(workdir, "reports"),
+            "RATE_LIMIT_STATE_DIR": os.path.join(workdir, "rate_limits"),
+        }
+    )
+    # The fakes have no rate limits; set OPENAI_MODEL_BUDGETS to test the
+    # scheduler against the real ones
+    os.environ.setdefault(
+        "OPENAI_MODEL_BUDGETS",
+        json.dumps(
+            {
+                model: {"requests_per_minute": 10**6, "tokens_per_minute": 10**9}
+                for model in ["gpt-4-turbo-preview", "gpt-4o"]
+            }
+        ),
+    )
+    fake_backends.FakeDDGS.base_url = backend_url
+
+    # Imported here once rather than by the first sessions at the same time
+    import deck_pipeline  # noqa: F401
+    import image_search
+    import summarizer  # noqa: F401
+
+    image_search.DDGS = fake_backends.FakeDDGS
+
+
+def make_document(session_id, document_chars, shared_document):
+    # The sample summaries repeated up to the requested size; the session id
+    # makes each document, and so every cache key, unique
+    text = "\n\n".join(SAMPLE_SUMMARIES)
+    text = (text + "\n\n") * math.ceil(document_chars / len(text))
+    header = "" if shared_document else f"Document {session_id}\n\n"
+    return (header + text[:document_chars]).encode()
+
+
+def run_session(session_id, args):
+    from deck_pipeline import generate_deck
+    from instrumentation import deck, span
+    from slide_generator import OUTPUT_TYPES
+    from summarizer import generate_summary, split_summary
+    from upload_registry import upload_registry
+
+    result = {"slides": 0, "failed_slides": 0, "error": None}
+    with deck(f"session-{session_id}") as report:
+        try:
+            with span("session"):
+                with span("save_uploaded_file"):
+                    upload_registry.expire()
+                    saved_file_path, _ = upload_registry.save_upload(
+                        f"document_{session_id}.txt",
+                        make_document(
+                            session_id, args.document_chars, args.shared_document
+                        ),
+                    )
+
+                summarized_content = generate_summary(
+                    saved_file_path, args.number_of_slides
+                )
+                slides = [
+                    {"content": content, "type": OUTPUT_TYPES[i % len(OUTPUT_TYPES)]}
+                    for i, content in enumerate(split_summary(summarized_content))
+                ]
+                result["slides"] = len(slides)
+
+                # The same flow as pages/slides.py, without the Streamlit calls
+                with span("generate_slides", mode=args.mode):
+                    outputs, image_futures = generate_deck(
+                        slides, stream=args.mode == "stream"
+                    )
+                result["failed_slides"] = sum("error" in output for output in outputs)
+
+                # Time left waiting on image lookups and downloads once the
+                # slides themselves are done
+                with span("image_wait"):
+                    for image_future in image_futures.values():
+                        image_future.result()
+        except Exception as e:
+            result["error"] = f"{type(e).__name__}: {e}"
+    result["report"] = report
+    return result
+
+
+def percentile(sorted_values, p):
+    # Nearest-rank percentile
+    rank = max(1, math.ceil(p / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize_results(results, wall_seconds):
+    durations = {}
+    errors = {}
+    tokens = {"prompt": 0, "completion": 0}
+    cost_usd = 0.0
+    for result in results:
+        for record in result["report"].spans:
+            durations.setdefault(record["stage"], []).append(record["duration"])
+            if record.get("error"):
+                errors[record["stage"]] = errors.get(record["stage"], 0) + 1
+            tokens["prompt"] += record.get("prompt_tokens", 0)
+            tokens["completion"] += record.get("completion_tokens", 0)
+            cost_usd += record.get("cost_usd", 0.0)
+
+    stages = []
+    for stage in STAGES + sorted(set(durations) - set(STAGES)):
+        if stage not in durations:
+            continue
+        values = sorted(durations[stage])
+        stages.append(
+            {
+                "stage": stage,
+                "count": len(values),
+                "p50": percentile(values, 50),
+                "p95": percentile(values, 95),
+                "p99": percentile(values, 99),
+                "max": values[-1],
+                "errors": errors.get(stage, 0),
+            }
+        )
+
+    completed = [result for result in results if result["error"] is None]
+    slides = sum(result["slides"] - result["failed_slides"] for result in completed)
+    return {
+        "sessions": len(results),
+        "failed_sessions": len(results) - len(completed),
+        "failed_slides": sum(result["failed_slides"] for result in results),
+        "wall_seconds": wall_seconds,
+        "sessions_per_second": len(completed) / wall_seconds,
+        "slides_per_second": slides / wall_seconds,
+        "tokens": tokens,
+        "cost_usd": cost_usd,
+        "stages": stages,
+        "errors": sorted({result["error"] for result in results if result["error"]}),
+    }
+
+
+def print_summary(summary):
+    print(
+        f"{summary['sessions'] - summary['failed_sessions']}/{summary['sessions']} "
+        f"sessions in {summary['wall_seconds']:.1f}s: "
+        f"{summary['sessions_per_second']:.2f} sessions/s, "
+        f"{summary['slides_per_second']:.2f} slides/s, "
+        f"{summary['failed_slides']} failed slides"
+    )
+    print(
+        f"Tokens: {summary['tokens']['prompt']} prompt, "
+        f"{summary['tokens']['completion']} completion, "
+        f"${summary['cost_usd']:.4f} at MODEL_PRICES"
+    )
+    print(
+        f"{'stage':<22} {'count':>6} {'p50':>8} {'p95':>8} {'p99':>8} "
+        f"{'max':>8} {'errors':>7}"
+    )
+    for stage in summary["stages"]:
+        print(
+            f"{stage['stage']:<22} {stage['count']:>6} {stage['p50']:>8.3f} "
+            f"{stage['p95']:>8.3f} {stage['p99']:>8.3f} {stage['max']:>8.3f} "
+            f"{stage['errors']:>7}"
+        )
+    for error in summary["errors"]:
+        print(f"Session error: {error}")
+
+
+def start_backends(args):
+    # Separate process, so serving the fakes does not compete with the app
+    # for the GIL
+    port_queue = multiprocessing.Queue()
+    process = multiprocessing.Process(
+        target=fake_backends.serve,
+        kwargs={
+            "port_queue": port_queue,
+            "llm_latency": args.llm_latency,
+            "llm_chunk_delay": args.llm_chunk_delay,
+            "llm_error_rate": args.llm_error_rate,
+            "image_latency": args.image_latency,
+            "image_error_rate": args.image_error_rate,
+            "vary_images": not args.shared_document,
+        },
+        daemon=True,
+    )
+    process.start()
+    return process, f"http://127.0.0.1:{port_queue.get(timeout=30)}"
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--sessions", type=int, default=20)
+    arg_parser.add_argument(
+        "--concurrency", type=int, default=5, help="Sessions running at once"
+    )
+    arg_parser.add_argument("--mode", choices=["stream", "batch"], default="stream")
+    arg_parser.add_argument("--number-of-slides", type=int, default=5)
+    arg_parser.add_argument(
+        "--document-chars",
+        type=int,
+        default=30000,
+        help="Uploaded document size, 30000 chars is three summary chunks",
+    )
+    arg_parser.add_argument(
+        "--shared-document",
+        action="store_true",
+        help="Upload the same document in every session to measure cache hits",
+    )
+    arg_parser.add_argument("--llm-latency", type=float, default=0.5)
+    arg_parser.add_argument("--llm-chunk-delay", type=float, default=0.005)
+    arg_parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    arg_parser.add_argument("--image-latency", type=float, default=0.1)
+    arg_parser.add_argument("--image-error-rate", type=float, default=0.0)
+    arg_parser.add_argument(
+        "--backend-url",
+        help="Use fake backends that are already running instead of starting them",
+    )
+    arg_parser.add_argument(
+        "--verbose",
+        action="store_true",
+        help="Show the task output the app prints, hidden by default",
+    )
+    arg_parser.add_argument("--json", help="Also write the results to this file")
+    arg_parser.add_argument(
+        "--max-p95",
+        type=float,
+        help="Exit non-zero if the session p95 latency is above this many seconds",
+    )
+    arg_parser.add_argument(
+        "--max-failed-sessions",
+        type=float,
+        default=0.0,
+        help="Exit non-zero if more than this fraction of sessions fails",
+    )
+    args = arg_parser.parse_args()
+
+    backend_url = args.backend_url
+    if backend_url is None:
+        _, backend_url = start_backends(args)
+    json_path = os.path.abspath(args.json) if args.json else None
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="slide-load-test-") as workdir:
+        configure_environment(workdir, backend_url)
+        # lyzr_automata prints every task's output, thousands of lines per run
+        output = sys.stdout if args.verbose else io.StringIO()
+        try:
+            with contextlib.redirect_stdout(output):
+                started = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+                    results = list(
+                        executor.map(
+                            lambda i: run_session(i, args), range(args.sessions)
+                        )
+                    )
+                summary = summarize_results(results, time.perf_counter() - started)
+        finally:
+            os.chdir(cwd)
+
+    print_summary(summary)
+    if json_path:
+        with open(json_path, "w") as f:
+            json.dump(summary, f, indent=2)
+
+    session_p95 = next(
+        (stage["p95"] for stage in summary["stages"] if stage["stage"] == "session"),
+        None,
+    )
+    if args.max_p95 is not None and (session_p95 is None or session_p95 > args.max_p95):
+        print(f"Regression: session p95 {session_p95}s > {args.max_p95}s")
+        sys.exit(1)
+    if summary["failed_sessions"] > args.max_failed_sessions * summary["sessions"]:
+        print(f"Regression: {summary['failed_sessions']} sessions failed")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+# Real model outputs captured while developing the app, see the commented-out
+# summarized_content in main.py and output_slides_list in pages/slides.py
+
+SAMPLE_SUMMARIES = [
+    '**Slide 1: Core Values of Nuveda**\n1. **Be Open, Honest and Constructive**: Emphasizes the importance of transparent communication for constructive decision-making and growth. Sharing issues openly can transform relationships positively.\n2. **Always Focus on Customer Value**: Highlights the necessity of understanding and meeting customer demands for the improvement of products and services, which leads to increased customer appreciation.\n3. **Be Accountable for What You Do**: Encourages taking responsibility for one’s actions and outcomes, promoting the mentality of seeing, owning, solving, and doing tasks to achieve desired results.\n<!END OF SLIDE>\n\n**Slide 2: Professional and Ethical Conduct**\n1. **Be Respectful Always**: Stresses treating everyone with respect to foster a mutually respectful environment. Direct communication can ameliorate personal interactions.\n2. **Demand Excellence**: Urges first demanding excellence from oneself and then from others, teaching the importance of self-reflection and proactive problem-solving for maintaining high standards.\n3. **Learn Always**: Advocates for continuous learning from peers, situations, and daily interactions. Being open to correction and questions fuels personal and professional growth.\n<!END OF SLIDE>\n\n**Slide 3: Leadership and Community Contribution**\n1. **Act Like an Owner**: Inspires taking ownership of tasks beyond designated responsibilities, fostering a culture where leaders and team members are invested and proactive.\n2. **Give Whenever and Wherever Possible**: Encourages helping others in any way possible. Even without specific knowledge, showing interest and asking questions can lead to solutions for others.\n<!END OF SLIDE>',
+    "**Slide 1: Core Values and Communication**  \n- **Be Open, Honest, and Constructive**: Emphasizes the importance of transparent and honest communication for personal and company growth. Positive confrontation is encouraged to resolve issues, leading to stronger relationships among colleagues.\n- **Example**: A scenario where a problem with a colleague's work habits is openly discussed, resulting in improved teamwork and friendship.  \n<!END OF SLIDE>\n\n**Slide 2: Customer Focus and Accountability**  \n- **Always Focus on Customer Value**: Prioritizing customer needs enhances the product and business. Understanding customer demands leads to greater appreciation from clients.\n- **Be Accountable for What You Do**: Encourages taking initiative to see, own, solve, and do tasks to achieve results. Ownership is highlighted as key to resolving broader issues proactively.\n- **Example**: Taking extra days to solve a pervasive problem in the app, demonstrating proactive problem-solving and ownership.\n<!END OF SLIDE>\n\n**Slide 3: Respect and Excellence**  \n- **Be Respectful Always**: Stresses the importance of mutual respect in the workplace for a positive environment. Addressing issues directly with individuals can lead to constructive changes.\n- **Demand Excellence**: Highlights the importance of self-expectation of excellence and the continuous pursuit of quality, especially in response to customer feedback.\n- **Example**: Improving testing practices after a customer complaint showcases a commitment to excellence and client satisfaction.\n<!END OF SLIDE>\n\n**Slide 4: Continuous Learning and Ownership**  \n- **Learn Always**: Encourages learning from a variety of sources including others, customers, and daily experiences. Openness to being corrected and learning from it is seen as invaluable.\n- **Act like an Owner**: Calls for responsibility and ownership of tasks, promoting a culture where everyone feels involved and invested in the company's success.\n- **Example**: An employee proactively resolving a website issue outside their job scope demonstrates ownership.\n<!END OF SLIDE>\n\n**Slide 5: Generosity and Support**  \n- **Give Whenever and Wherever Possible**: Advocates for extending help and support in any capacity, highlighting the impact of even simple questions in aiding colleagues.\n- **Example**: A team member assists another by asking insightful questions, demonstrating how non-expertise help can lead to solutions, fostering a supportive and collaborative work environment.\n<!END OF SLIDE>",
+]
+
+SAMPLE_SLIDE_OUTPUTS = [
+    {
+        "type": "Single Choice Quiz",
+        "generated_content": "<HEADING>Core Values and Communication</HEADING>  \n<TEXT>  \n- **Be Open, Honest, and Constructive**: Emphasizes the importance of transparent and honest communication for personal and company growth. Positive confrontation is encouraged to resolve issues, leading to stronger relationships among colleagues.  \n- **Example**: A scenario where a problem with a colleague's work habits is openly discussed, resulting in improved teamwork and friendship.  \n</TEXT>  \n<QUESTION>What is emphasized as important for personal and company growth?</QUESTION>  \n<OPTIONS>[Transparent and honest communication, Avoiding confrontation, Ignoring issues]</OPTIONS>  \n<ANSWER>{Transparent and honest communication}</ANSWER>",
+    },
+    {
+        "type": "Bullet Points",
+        "generated_content": '<HEADING>Customer Focus and Accountability</HEADING>  \n<TEXT>\n- **Always Focus on Customer Value**: Prioritizing customer needs enhances the product and business. Understanding customer demands leads to greater appreciation from clients.\n- **Be Accountable for What You Do**: Encourages taking initiative to see, own, solve, and do tasks to achieve results. Ownership is highlighted as key to resolving broader issues proactively.\n- **Example**: Taking extra days to solve a pervasive problem in the app, demonstrating proactive problem-solving and ownership.\n</TEXT>  \n<IMAGE>{Illustration of a team working together to solve a customer issue, showcasing accountability and customer focus}</IMAGE>',
+    },
+    {
+        "type": "Multiple Choice Quiz",
+        "generated_content": '<HEADING>Respect and Excellence</HEADING>  \n<TEXT>  \n- **Be Respectful Always**: Stresses the importance of mutual respect in the workplace for a positive environment. Addressing issues directly with individuals can lead to constructive changes.  \n- **Demand Excellence**: Highlights the importance of self-expectation of excellence and the continuous pursuit of quality, especially in response to customer feedback.  \n- **Example**: Improving testing practices after a customer complaint showcases a commitment to excellence and client satisfaction.  \n</TEXT>  \n<QUESTION>Which of the following best describes the importance of mutual respect in the workplace?</QUESTION>  \n<OPTIONS>[It creates a positive environment, It leads to constructive changes, Both of the above]</OPTIONS>  \n<ANSWER>{Both of the above}</ANSWER>  \n\n<QUESTION>What does demanding excellence in the workplace involve?</QUESTION>  \n<OPTIONS>[Self-expectation of excellence, Continuous pursuit of quality, Both of the above]</OPTIONS>  \n<ANSWER>{Both of the above}</ANSWER>  \n\n<QUESTION>How can addressing issues directly with individuals benefit the workplace?</QUESTION>  \n<OPTIONS>[It can lead to constructive changes, It can create conflicts, It has no impact]</OPTIONS>  \n<ANSWER>{It can lead to constructive changes}</ANSWER>  \n\n<QUESTION>What is an example of demonstrating a commitment to excellence?</QUESTION>  \n<OPTIONS>[Ignoring customer complaints, Improving testing practices after a customer complaint, Maintaining the status quo]</OPTIONS>  \n<ANSWER>{Improving testing practices after a customer complaint}</ANSWER>',
+    },
+    {
+        "type": "True/False Quiz",
+        "generated_content": "<HEADING>Continuous Learning and Ownership</HEADING>  \n<TEXT>Continuous learning and ownership are crucial for personal and professional growth. Encouraging learning from various sources, including colleagues, customers, and everyday experiences, fosters a culture of openness and improvement. Being open to correction and learning from mistakes is invaluable. Acting like an owner means taking responsibility and ownership of tasks, promoting a culture where everyone feels involved and invested in the company's success. For example, an employee who proactively resolves a website issue outside their job scope demonstrates true ownership.</TEXT>  \n\n<QUESTION>Continuous learning involves being open to correction and learning from mistakes.</QUESTION>  \n<ANSWER>True</ANSWER>  \n\n<QUESTION>Acting like an owner means only focusing on tasks within your job description.</QUESTION>  \n<ANSWER>False</ANSWER>  \n\n<QUESTION>Proactively resolving issues outside your job scope is an example of ownership.</QUESTION>  \n<ANSWER>True</ANSWER>",
+    },
+    {
+        "type": "Fill in the Blank Quiz",
+        "generated_content": "<HEADING>Generosity and Support</HEADING>\n\n<TEXT>\n- **Give Whenever and Wherever Possible**: It's important to extend help and support in any capacity. Even simple questions can have a significant impact in aiding colleagues. This approach fosters a supportive and collaborative work environment.\n- **Example**: A team member assists another by asking insightful questions. This demonstrates how non-expertise help can lead to solutions, further promoting a culture of generosity and support within the team.\n</TEXT>\n\n<QUESTION>Generosity and support in the workplace can be demonstrated by extending help and support in any capacity, highlighting the impact of even simple _______ in aiding colleagues.</QUESTION> \n\n<ANSWER>questions</ANSWER>\n\n<IMAGE>{Illustration of a team member assisting another by asking questions}</IMAGE>",
+    },
+]
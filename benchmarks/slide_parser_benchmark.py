@@ -0,0 +1,127 @@
+# Compares slide_parser.extract_content against the per-tag regex extractor it
+# replaced, on the real sample outputs and on synthetic large quiz slides.
+# "extract" is the shipped function, including the option and answer
+# normalization the regex extractor never did, and is what the speedup and
+# --min-speedup are measured on. "tokenize" is the streaming parser's bare
+# scan, for reference. The default --min-speedup fails the run when extract
+# falls clearly behind regex on any case.
+#
+#   python benchmarks/slide_parser_benchmark.py [--repeat N] [--min-speedup X]
+import argparse
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.sample_outputs import SAMPLE_SLIDE_OUTPUTS  # noqa: E402
+from slide_parser import SlideStreamParser, extract_content  # noqa: E402
+
+patterns = {
+    "TEXT": re.compile(r"<TEXT>(.*?)</TEXT>", re.DOTALL),
+    "IMAGE": re.compile(r"<IMAGE>(.*?)</IMAGE>", re.DOTALL),
+    "QUESTION": re.compile(r"<QUESTION>(.*?)</QUESTION>", re.DOTALL),
+    "OPTIONS": re.compile(r"<OPTIONS>(.*?)</OPTIONS>", re.DOTALL),
+    "ANSWER": re.compile(r"<ANSWER>(.*?)</ANSWER>", re.DOTALL),
+    "HEADING": re.compile(r"<HEADING>(.*?)</HEADING>", re.DOTALL),
+}
+
+
+def regex_extract_content(slide_content):
+    extracted_content = {}
+
+    for key in ["TEXT", "IMAGE", "HEADING"]:
+        match = patterns[key].search(slide_content)
+        if match:
+            extracted_content[key] = match.group(1).strip()
+
+    for key in ["QUESTION", "OPTIONS", "ANSWER"]:
+        matches = patterns[key].findall(slide_content)
+        if matches:
+            extracted_content[key] = [match.strip() for match in matches]
+
+    return extracted_content
+
+
+def large_quiz_slide(number_of_questions):
+    # Multiple Choice sample with its question blocks repeated
+    sample = SAMPLE_SLIDE_OUTPUTS[2]["generated_content"]
+    quiz_start = sample.index("<QUESTION>")
+    head, quiz = sample[:quiz_start], sample[quiz_start:].strip() + "\n\n"
+    repeats = -(-number_of_questions // quiz.count("<QUESTION>"))
+    return head + quiz * repeats
+
+
+def tokenize(slide_content):
+    parser = SlideStreamParser()
+    return parser.feed(slide_content) + parser.close()
+
+
+def check_samples():
+    # Both parsers must agree on the well-formed parts of every sample
+    for sample in SAMPLE_SLIDE_OUTPUTS:
+        content = sample["generated_content"]
+        expected = regex_extract_content(content)
+        actual = extract_content(content)
+        for key in ["HEADING", "TEXT", "QUESTION"]:
+            assert actual.get(key) == expected.get(key), (sample["type"], key)
+        assert len(actual.get("ANSWER", [])) == len(expected.get("ANSWER", []))
+        assert len(actual.get("OPTIONS", [])) == len(expected.get("OPTIONS", []))
+
+
+def bench(name, content, repeat):
+    # Best of interleaved rounds, so a noisy neighbour slows all three alike
+    functions = [regex_extract_content, tokenize, extract_content]
+    best = [float("inf")] * len(functions)
+    for _ in range(9):
+        for i, function in enumerate(functions):
+            seconds = timeit.timeit(lambda: function(content), number=repeat)
+            best[i] = min(best[i], seconds)
+    regex_speed, tokenize_speed, extract_speed = (
+        len(content) * repeat / 1024**2 / seconds for seconds in best
+    )
+    print(
+        f"{name:<24} {len(content):>9} {regex_speed:>8.1f} {tokenize_speed:>8.1f} "
+        f"{extract_speed:>8.1f} {extract_speed / regex_speed:>8.2f}x"
+    )
+    return extract_speed / regex_speed
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--repeat", type=int, default=200)
+    arg_parser.add_argument(
+        "--min-speedup",
+        type=float,
+        default=0.9,
+        help="Exit non-zero if extract's speedup on any case falls below this; "
+        "large quizzes run about even with regex, the margin is for timing noise",
+    )
+    args = arg_parser.parse_args()
+
+    check_samples()
+
+    print("Throughput in MB/s; speedup is extract over regex")
+    print(
+        f"{'case':<24} {'chars':>9} {'regex':>8} {'tokenize':>8} "
+        f"{'extract':>8} {'speedup':>9}"
+    )
+    speedups = []
+    for sample in SAMPLE_SLIDE_OUTPUTS:
+        speedups.append(
+            bench(sample["type"], sample["generated_content"], args.repeat)
+        )
+
+    for number_of_questions in [50, 500, 5000]:
+        content = large_quiz_slide(number_of_questions)
+        repeat = max(1, args.repeat * 1000 // len(content))
+        speedups.append(bench(f"Quiz x{number_of_questions}", content, repeat))
+
+    if min(speedups) < args.min_speedup:
+        print(f"Regression: speedup {min(speedups):.2f}x < {args.min_speedup}x")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
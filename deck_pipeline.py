@@ -0,0 +1,68 @@
+from image_search import image_resolver
+from image_store import image_store
+from instrumentation import span
+from slide_generator import generate_slides_concurrently, stream_slides_concurrently
+from slide_parser import add_block, extract_content
+
+
+def image_future_for(slide, localize=True):
+    # Future of the slide's image, the local path when localized and the
+    # remote url otherwise; None for slides without an image
+    image = slide.get("generated_content", {}).get("IMAGE")
+    if not image:
+        return None
+    image_future = image_resolver.resolve(image)
+    if localize:
+        image_future = image_store.localize(image_future)
+    return image_future
+
+
+def generate_deck(slides, stream=False, on_block=None, images=True, localize=True):
+    # Generates, parses and starts the image lookups for a list of
+    # {"content", "type"} slides, the per-deck flow shared by pages/slides.py,
+    # the service and the load test. Returns one output per slide, with
+    # either "generated_content" or "error", and the image future of every
+    # slide that has one, keyed by slide index.
+    #
+    # With stream=True, on_block(i, tag, content, image_future) is called on
+    # the calling thread for each block as soon as it is parsed, with the
+    # IMAGE block's future and tag "ERROR" for a failed slide. Lookups start
+    # as their IMAGE block arrives, in batch mode once every slide is parsed.
+    outputs = [{"type": slide["type"]} for slide in slides]
+    image_futures = {}
+
+    if stream:
+        for output in outputs:
+            output["generated_content"] = {}
+        for i, tag, content in stream_slides_concurrently(slides):
+            image_future = None
+            if tag == "ERROR":
+                outputs[i]["error"] = content
+            else:
+                content = add_block(outputs[i]["generated_content"], tag, content)
+                if tag == "IMAGE" and images:
+                    image_future = image_futures[i] = image_future_for(
+                        outputs[i], localize
+                    )
+            if on_block is not None:
+                on_block(i, tag, content, image_future)
+        return outputs, image_futures
+
+    generation_results = generate_slides_concurrently(slides)
+    # One span for the whole deck, parsing a slide takes microseconds
+    with span("extract_content"):
+        for output, result in zip(outputs, generation_results):
+            if result["error"] is not None:
+                output["error"] = result["error"]
+            else:
+                output["generated_content"] = extract_content(
+                    result["generated_slide"]
+                )
+
+    if images:
+        # Start every lookup before the caller waits on the first one
+        for i, output in enumerate(outputs):
+            image_future = image_future_for(output, localize)
+            if image_future is not None:
+                image_futures[i] = image_future
+    return outputs, image_futures
@@ -0,0 +1,111 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from duckduckgo_search import DDGS
+
+import instrumentation
+from instrumentation import instrumented
+
+MAX_CONCURRENT_IMAGE_SEARCHES = int(os.getenv("MAX_CONCURRENT_IMAGE_SEARCHES", 4))
+IMAGE_CACHE_TTL = int(os.getenv("IMAGE_CACHE_TTL", 24 * 60 * 60))
+IMAGE_CACHE_MAX_ENTRIES = int(os.getenv("IMAGE_CACHE_MAX_ENTRIES", 10000))
+# Shown when a lookup fails or finds nothing; None renders a caption instead
+FALLBACK_IMAGE_URL = os.getenv("FALLBACK_IMAGE_URL")
+
+logger = logging.getLogger(__name__)
+
+_clients = threading.local()
+
+
+def _ddgs_client():
+    # One client per worker thread, reused across lookups
+    if not hasattr(_clients, "ddgs"):
+        _clients.ddgs = DDGS()
+    return _clients.ddgs
+
+
+@instrumented("search_image_online")
+def search_image_online(prompt):
+    results = _ddgs_client().images(
+        keywords=prompt,
+        region="wt-wt",
+        safesearch="off",
+        size=None,
+        type_image="photo",
+        license_image="share",
+        max_results=1,
+    )
+
+    return results
+
+
+class ImageResolver:
+    # Resolves image queries to URLs on a bounded pool. resolve() returns a
+    # Future right away, so lookups can start while slides are still being
+    # generated; identical queries share one lookup and one cache entry.
+    def __init__(
+        self,
+        max_workers=MAX_CONCURRENT_IMAGE_SEARCHES,
+        ttl=IMAGE_CACHE_TTL,
+        max_entries=IMAGE_CACHE_MAX_ENTRIES,
+        fallback_url=FALLBACK_IMAGE_URL,
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.fallback_url = fallback_url
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="image-search"
+        )
+        self._lock = threading.Lock()
+        # query -> (stored at, url), oldest first
+        self._cache = OrderedDict()
+        self._in_flight = {}
+
+    def resolve(self, query):
+        query = query.strip()
+        with self._lock:
+            cached = self._cache.get(query)
+            if cached is not None and time.time() - cached[0] < self.ttl:
+                future = Future()
+                future.set_result(cached[1])
+                return future
+            if query not in self._in_flight:
+                self._in_flight[query] = instrumentation.submit(
+                    self._executor, self._lookup, query
+                )
+            return self._in_flight[query]
+
+    def _lookup(self, query):
+        image_url = None
+        try:
+            results = search_image_online(query)
+            if results:
+                image_url = results[0]["image"]
+        except Exception as e:
+            logger.warning("Image search failed for %r: %s", query, e)
+
+        with self._lock:
+            self._in_flight.pop(query, None)
+            # Failed lookups are not cached so the next render retries them
+            if image_url is not None:
+                self._store(query, image_url)
+        return image_url or self.fallback_url
+
+    def _store(self, query, image_url):
+        # Called under the lock. Entries stay in insertion order, so expired
+        # ones and the overflow are always at the front.
+        now = time.time()
+        self._cache.pop(query, None)
+        self._cache[query] = (now, image_url)
+        while self._cache:
+            stored_at, _ = next(iter(self._cache.values()))
+            if now - stored_at < self.ttl and len(self._cache) <= self.max_entries:
+                break
+            self._cache.popitem(last=False)
+
+
+image_resolver = ImageResolver()
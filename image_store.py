@@ -0,0 +1,216 @@
+import hashlib
+import io
+import json
+import logging
+import os
+import threading
+import urllib.request
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from PIL import Image
+
+import instrumentation
+from instrumentation import instrumented
+
+IMAGE_STORE_DIR = os.getenv("IMAGE_STORE_DIR", os.path.join(".cache", "images"))
+IMAGE_STORE_MAX_BYTES = int(os.getenv("IMAGE_STORE_MAX_BYTES", 200 * 1024**2))
+MAX_CONCURRENT_IMAGE_DOWNLOADS = int(os.getenv("MAX_CONCURRENT_IMAGE_DOWNLOADS", 4))
+IMAGE_DOWNLOAD_TIMEOUT = int(os.getenv("IMAGE_DOWNLOAD_TIMEOUT", 10))
+IMAGE_DOWNLOAD_MAX_BYTES = int(os.getenv("IMAGE_DOWNLOAD_MAX_BYTES", 20 * 1024**2))
+
+# Longest side in pixels for each stored rendition
+RENDITIONS = {"slide": 1280, "thumbnail": 320}
+INDEX_FILE = "index.json"
+
+logger = logging.getLogger(__name__)
+
+
+class ImageStore:
+    # Downloads remote images, keeps downscaled JPEG renditions on disk named
+    # by the sha256 of the original bytes, and evicts the least recently used
+    # renditions past max_bytes. Only the renditions that are asked for are
+    # made.
+    def __init__(
+        self,
+        store_dir=IMAGE_STORE_DIR,
+        max_bytes=IMAGE_STORE_MAX_BYTES,
+        max_workers=MAX_CONCURRENT_IMAGE_DOWNLOADS,
+    ):
+        self.store_dir = store_dir
+        self.max_bytes = max_bytes
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="image-download"
+        )
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        os.makedirs(self.store_dir, exist_ok=True)
+        # url -> content hash, so a known url skips the download entirely
+        self._index = self._load_index()
+
+    def _path(self, content_hash, rendition):
+        return os.path.join(self.store_dir, f"{content_hash}_{rendition}.jpg")
+
+    def _load_index(self):
+        try:
+            with open(os.path.join(self.store_dir, INDEX_FILE), "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _save_index(self):
+        path = os.path.join(self.store_dir, INDEX_FILE)
+        # Called under the lock; the pid keeps processes from sharing a tmp file
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self._index, f)
+        os.replace(tmp_path, path)
+
+    def get(self, url, rendition="slide"):
+        # Local path for an already stored url, or None
+        with self._lock:
+            content_hash = self._index.get(url)
+            if content_hash is None:
+                return None
+            path = self._path(content_hash, rendition)
+            try:
+                os.utime(path)
+            except FileNotFoundError:
+                return None
+            return path
+
+    def fetch(self, url, rendition="slide"):
+        # Future resolving to the local path, or to the remote url when the
+        # download fails so the page can still show something
+        path = self.get(url, rendition)
+        if path is not None:
+            future = Future()
+            future.set_result(path)
+            return future
+
+        with self._lock:
+            if (url, rendition) not in self._in_flight:
+                self._in_flight[url, rendition] = instrumentation.submit(
+                    self._executor, self._download, url, rendition
+                )
+            download = self._in_flight[url, rendition]
+
+        result = Future()
+
+        def on_download(done):
+            # Always settles result, so nobody waiting on it hangs
+            path = url
+            try:
+                content_hash = done.result()
+                if content_hash is not None:
+                    path = self._path(content_hash, rendition)
+            except Exception as e:
+                logger.warning("Image download failed for %r: %s", url, e)
+            result.set_result(path)
+
+        download.add_done_callback(on_download)
+        return result
+
+    def localize(self, url_future, rendition="slide"):
+        # Chains onto an ImageResolver future without blocking a worker
+        result = Future()
+
+        def on_url(done):
+            # Falls back to the remote url, or None, if anything here fails
+            url = None
+            try:
+                url = done.result()
+                if url:
+                    self.fetch(url, rendition).add_done_callback(
+                        lambda fetched: result.set_result(fetched.result())
+                    )
+                    return
+            except Exception as e:
+                logger.warning("Could not store image %r: %s", url, e)
+            result.set_result(url or None)
+
+        url_future.add_done_callback(instrumentation.bind(on_url))
+        return result
+
+    @instrumented("image_download")
+    def _download(self, url, rendition):
+        content_hash = None
+        try:
+            request = urllib.request.Request(
+                url, headers={"User-Agent": "Mozilla/5.0 slide-generator"}
+            )
+            with urllib.request.urlopen(
+                request, timeout=IMAGE_DOWNLOAD_TIMEOUT
+            ) as response:
+                data = response.read(IMAGE_DOWNLOAD_MAX_BYTES + 1)
+            if len(data) > IMAGE_DOWNLOAD_MAX_BYTES:
+                raise ValueError("image is larger than IMAGE_DOWNLOAD_MAX_BYTES")
+
+            content_hash = hashlib.sha256(data).hexdigest()
+            # Identical bytes from another url reuse the stored rendition
+            if not os.path.exists(self._path(content_hash, rendition)):
+                self._write_rendition(data, content_hash, rendition)
+        except Exception as e:
+            logger.warning("Image download failed for %r: %s", url, e)
+            content_hash = None
+
+        with self._lock:
+            self._in_flight.pop((url, rendition), None)
+            if content_hash is not None:
+                self._index[url] = content_hash
+                try:
+                    self._evict()
+                    self._save_index()
+                except OSError as e:
+                    # The rendition is stored, only the bookkeeping failed
+                    logger.warning("Could not update the image index: %s", e)
+        return content_hash
+
+    def _write_rendition(self, data, content_hash, rendition):
+        max_side = RENDITIONS[rendition]
+        with Image.open(io.BytesIO(data)) as image:
+            # draft() lets the JPEG decoder skip detail the rendition drops
+            image.draft("RGB", (max_side, max_side))
+            image = image.convert("RGB")
+            image.thumbnail((max_side, max_side))
+            path = self._path(content_hash, rendition)
+            # Two urls with the same bytes may be written at the same time, by
+            # this process or another one
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            image.save(tmp_path, format="JPEG", quality=85)
+            os.replace(tmp_path, path)
+
+    def _evict(self):
+        # Called under the lock. Drops the least recently used renditions past
+        # max_bytes, then the index entries left without any rendition.
+        entries = []
+        for name in os.listdir(self.store_dir):
+            if not name.endswith(".jpg"):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.store_dir, name))
+            except FileNotFoundError:
+                # Another process evicted it first
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+
+        total_size = sum(size for _, size, _ in entries)
+        stored = {name for _, _, name in entries}
+        for _, size, name in sorted(entries):
+            if total_size <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.store_dir, name))
+            except FileNotFoundError:
+                pass
+            stored.discard(name)
+            total_size -= size
+
+        stored_hashes = {name.split("_", 1)[0] for name in stored}
+        self._index = {
+            url: content_hash
+            for url, content_hash in self._index.items()
+            if content_hash in stored_hashes
+        }
+
+
+image_store = ImageStore()
@@ -0,0 +1,270 @@
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from functools import wraps
+
+REPORTS_DIR = os.getenv("REPORTS_DIR", "reports")
+DURATION_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+# USD per million tokens; override with a JSON object of the same shape, e.g.
+# OPENAI_MODEL_PRICES='{"gpt-4o": {"prompt": 2.5, "completion": 10}}'
+MODEL_PRICES = {
+    "gpt-4o": {"prompt": 2.50, "completion": 10.00},
+    "gpt-4-turbo-preview": {"prompt": 10.00, "completion": 30.00},
+}
+MODEL_PRICES.update(json.loads(os.getenv("OPENAI_MODEL_PRICES", "{}")))
+
+_current_deck = contextvars.ContextVar("current_deck", default=None)
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+class Metrics:
+    # Process-wide aggregates of every span, exported in Prometheus text format
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._durations = {}
+        self._errors = {}
+        self._tokens = {}
+        self._cost = {}
+        self._cache = {}
+
+    def observe(self, record):
+        stage = record["stage"]
+        with self._lock:
+            buckets = self._durations.setdefault(
+                stage,
+                {"buckets": [0] * len(DURATION_BUCKETS), "sum": 0.0, "count": 0},
+            )
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if record["duration"] <= bound:
+                    buckets["buckets"][i] += 1
+            buckets["sum"] += record["duration"]
+            buckets["count"] += 1
+
+            if record.get("error"):
+                self._errors[stage] = self._errors.get(stage, 0) + 1
+            for kind in ("prompt", "completion"):
+                tokens = record.get(f"{kind}_tokens")
+                if tokens:
+                    key = (stage, kind)
+                    self._tokens[key] = self._tokens.get(key, 0) + tokens
+            if record.get("cost_usd"):
+                key = (stage, record.get("model", ""))
+                self._cost[key] = self._cost.get(key, 0.0) + record["cost_usd"]
+            if "cache_hit" in record:
+                key = (stage, "hit" if record["cache_hit"] else "miss")
+                self._cache[key] = self._cache.get(key, 0) + 1
+
+    def prometheus_text(self):
+        duration = "slide_generator_stage_duration_seconds"
+        errors = "slide_generator_stage_errors_total"
+        tokens = "slide_generator_tokens_total"
+        cost = "slide_generator_cost_usd_total"
+        cache = "slide_generator_cache_requests_total"
+        lines = [
+            f"# HELP {duration} Time spent per pipeline stage",
+            f"# TYPE {duration} histogram",
+        ]
+        with self._lock:
+            for stage, buckets in sorted(self._durations.items()):
+                for bound, count in zip(DURATION_BUCKETS, buckets["buckets"]):
+                    lines.append(
+                        f'{duration}_bucket{{stage="{stage}",le="{bound}"}} {count}'
+                    )
+                lines.append(
+                    f'{duration}_bucket{{stage="{stage}",le="+Inf"}} {buckets["count"]}'
+                )
+                lines.append(f'{duration}_sum{{stage="{stage}"}} {buckets["sum"]}')
+                lines.append(f'{duration}_count{{stage="{stage}"}} {buckets["count"]}')
+
+            lines.append(f"# TYPE {errors} counter")
+            for stage, count in sorted(self._errors.items()):
+                lines.append(f'{errors}{{stage="{stage}"}} {count}')
+
+            lines.append(f"# TYPE {tokens} counter")
+            for (stage, kind), count in sorted(self._tokens.items()):
+                lines.append(f'{tokens}{{stage="{stage}",kind="{kind}"}} {count}')
+
+            lines.append(f"# HELP {cost} Estimated OpenAI spend from MODEL_PRICES")
+            lines.append(f"# TYPE {cost} counter")
+            for (stage, model), usd in sorted(self._cost.items()):
+                lines.append(f'{cost}{{stage="{stage}",model="{model}"}} {usd}')
+
+            lines.append(f"# TYPE {cache} counter")
+            for (stage, result), count in sorted(self._cache.items()):
+                lines.append(f'{cache}{{stage="{stage}",result="{result}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+class DeckReport:
+    # Spans recorded while one deck was being produced
+    def __init__(self, deck_id=None):
+        self.deck_id = deck_id or uuid.uuid4().hex
+        self.started = time.time()
+        self.finished = None
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def add(self, record):
+        with self._lock:
+            self.spans.append(record)
+
+    def stage_summary(self):
+        stages = {}
+        with self._lock:
+            spans = list(self.spans)
+        for record in spans:
+            stage = stages.setdefault(
+                record["stage"],
+                {
+                    "stage": record["stage"],
+                    "count": 0,
+                    "total_seconds": 0.0,
+                    "max_seconds": 0.0,
+                    "prompt_tokens": 0,
+                    "completion_tokens": 0,
+                    "cost_usd": 0.0,
+                    "cache_hits": 0,
+                    "errors": 0,
+                },
+            )
+            stage["count"] += 1
+            stage["total_seconds"] += record["duration"]
+            stage["max_seconds"] = max(stage["max_seconds"], record["duration"])
+            stage["prompt_tokens"] += record.get("prompt_tokens", 0)
+            stage["completion_tokens"] += record.get("completion_tokens", 0)
+            stage["cost_usd"] += record.get("cost_usd", 0.0)
+            stage["cache_hits"] += 1 if record.get("cache_hit") else 0
+            stage["errors"] += 1 if record.get("error") else 0
+        return list(stages.values())
+
+    def to_dict(self):
+        finished = self.finished or time.time()
+        with self._lock:
+            spans = list(self.spans)
+        stages = self.stage_summary()
+        return {
+            "deck_id": self.deck_id,
+            "started": self.started,
+            "wall_seconds": finished - self.started,
+            # Usage is only recorded on the innermost span, so this is not
+            # counted twice
+            "cost_usd": sum(stage["cost_usd"] for stage in stages),
+            "stages": stages,
+            "spans": spans,
+        }
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), indent=2, default=str)
+
+    def save(self, reports_dir=REPORTS_DIR):
+        os.makedirs(reports_dir, exist_ok=True)
+        path = os.path.join(reports_dir, f"{self.deck_id}.json")
+        with open(path, "w") as f:
+            f.write(self.to_json())
+        return path
+
+
+@contextmanager
+def deck(deck_id=None):
+    # Collects every span recorded in this context, including the ones run on
+    # worker pools through submit(), into one DeckReport
+    report = DeckReport(deck_id)
+    token = _current_deck.set(report)
+    try:
+        yield report
+    finally:
+        report.finished = time.time()
+        _current_deck.reset(token)
+
+
+@contextmanager
+def span(stage, **attributes):
+    parent = _current_span.get()
+    record = {
+        "span_id": uuid.uuid4().hex[:16],
+        "parent_id": parent["span_id"] if parent else None,
+        "stage": stage,
+        "start": time.time(),
+        "thread": threading.current_thread().name,
+        **attributes,
+    }
+    token = _current_span.set(record)
+    started = time.perf_counter()
+    try:
+        yield record
+    except Exception as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        record["duration"] = time.perf_counter() - started
+        _current_span.reset(token)
+        metrics.observe(record)
+        report = _current_deck.get()
+        if report is not None:
+            report.add(record)
+
+
+def instrumented(stage):
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            with span(stage):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def annotate(**attributes):
+    # Adds attributes such as cache_hit to the innermost open span
+    record = _current_span.get()
+    if record is not None:
+        record.update(attributes)
+
+
+def usage_cost(model, prompt_tokens, completion_tokens):
+    # Estimated USD for a call, None for a model missing from MODEL_PRICES
+    prices = MODEL_PRICES.get(model)
+    if prices is None:
+        return None
+    return (
+        prompt_tokens * prices["prompt"] + completion_tokens * prices["completion"]
+    ) / 1e6
+
+
+def record_usage(usage, model=None):
+    # Adds an OpenAI usage object's token counts, and what they cost, to the
+    # innermost open span
+    record = _current_span.get()
+    if record is None or usage is None:
+        return
+    record["prompt_tokens"] = record.get("prompt_tokens", 0) + usage.prompt_tokens
+    record["completion_tokens"] = (
+        record.get("completion_tokens", 0) + usage.completion_tokens
+    )
+    cost = usage_cost(model, usage.prompt_tokens, usage.completion_tokens)
+    if cost is not None:
+        record["model"] = model
+        record["cost_usd"] = record.get("cost_usd", 0.0) + cost
+
+
+def submit(executor, function, *args, **kwargs):
+    # Runs function on the executor inside a copy of the caller's context, so
+    # worker spans land in the caller's deck report under the caller's span
+    return executor.submit(contextvars.copy_context().run, function, *args, **kwargs)
+
+
+def bind(function):
+    # For Future callbacks, which run on whichever thread finishes the future:
+    # runs function inside a copy of the context it was bound in
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.copy().run(function, *args, **kwargs)
@@ -0,0 +1,75 @@
+from lyzr_automata.ai_models.openai import OpenAIModel
+
+from instrumentation import record_usage
+from request_scheduler import estimate_tokens, request_scheduler, request_timeout
+
+
+class OpenAIChatModel(OpenAIModel):
+    # OpenAIModel that goes through the shared request scheduler, reports
+    # token usage to the current span and can also stream a completion
+    def __init__(self, api_key, parameters):
+        super().__init__(api_key, parameters)
+        # The scheduler retries, with backoff shared across all calls
+        self.timeout = request_timeout(self.parameters.get("max_tokens"))
+        self.client = self.client.with_options(max_retries=0, timeout=self.timeout)
+
+    def generate_text(
+        self,
+        task_id=None,
+        system_persona=None,
+        prompt=None,
+        messages=None,
+    ):
+        if messages is None:
+            messages = [
+                {"role": "system", "content": system_persona},
+                {"role": "user", "content": prompt},
+            ]
+
+        response = request_scheduler.run(
+            self.parameters["model"],
+            estimate_tokens(messages, self.parameters.get("max_tokens")),
+            lambda: self.client.chat.completions.create(
+                **self.parameters, messages=messages
+            ),
+            timeout=self.timeout,
+        )
+        record_usage(response.usage, self.parameters["model"])
+        return response.choices[0].message.content
+
+    def _create_stream(self, messages):
+        try:
+            return self.client.chat.completions.create(
+                **self.parameters,
+                messages=messages,
+                stream=True,
+                stream_options={"include_usage": True},
+            )
+        except TypeError:
+            # Older openai clients do not know stream_options
+            return self.client.chat.completions.create(
+                **self.parameters, messages=messages, stream=True
+            )
+
+    def stream_text(self, messages):
+        # Only opening the stream is retried; once tokens have been yielded a
+        # failure is raised to the caller
+        model = self.parameters["model"]
+        tokens = estimate_tokens(messages, self.parameters.get("max_tokens"))
+        stream = request_scheduler.run(
+            model, tokens, lambda: self._create_stream(messages), timeout=self.timeout
+        )
+
+        used = tokens
+        try:
+            for chunk in stream:
+                if getattr(chunk, "usage", None):
+                    record_usage(chunk.usage, model)
+                    used = chunk.usage.total_tokens
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    yield delta
+        finally:
+            request_scheduler.settle(model, tokens, used)
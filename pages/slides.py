@@ -1,106 +1,107 @@
-import os
-import re
-
 import streamlit as st
-from dotenv import load_dotenv
-from duckduckgo_search import DDGS
-from lyzr_automata import Agent, Task
-from lyzr_automata.ai_models.openai import OpenAIModel
-from lyzr_automata.tasks.task_literals import InputType, OutputType
-
-load_dotenv()
-
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-
-open_ai_model_text = OpenAIModel(
-    api_key=OPENAI_API_KEY,
-    parameters={
-        "model": "gpt-4o",
-        "temperature": 0.2,
-        "max_tokens": 1500,
-    },
-)
-
-
-# ["Bullet Points","Single Choice Quiz","Multiple Choice Quiz","True/False Quiz","Fill in the Blank Quiz"]
-def generate_slide_content(input_content, slide_type):
-    presentation_generation_agent = Agent(
-        prompt_persona="""You are a slide generator agent that can generate interactive slide for a presentation on a given topic for a Learning management system. You have following output formats:
-    1. Bullet Points - Format - <TEXT>5 bullet points</TEXT> <IMAGE>Query to search the internet for a suitable image</IMAGE>
-    2. Single Choice Quiz - Format - <QUESTION>Generated question</QUESTION> <OPTIONS>[Option1, Option2, Option3]</OPTIONS> <ANSWER>Option1</ANSWER>
-    3. Multiple Choice Quiz - Format - <QUESTION>Generated question</QUESTION> <OPTIONS>[Option1, Option2, Option3]</OPTIONS> <ANSWER>{Option1, Option 2</ANSWER>
-    4. True/False Quiz - Format - <QUESTION>Generated question</QUESTION> <ANSWER>True/False</ANSWER>
-    5. Fill in the blank Quiz - Format - <QUESTION>Generated question</QUESTION> <ANSWER>Fill in the blank</ANSWER>
-
-    Single Choice Quiz has only 1 correct answer, Multiple Choice Quiz has more than 1 correct answers.
-    Each output format should contain a heading and a text - <HEADING>Slide Heading</HEADING> <TEXT>3 bullet points</TEXT>
-    Generate TEXT in a way it explains the content in an easy to understand way, with more words. Feel free to use your creativity to expand on the topic/content. Generate enough Quiz questions to cover the topic/content.
-""",
-        role="Presentation generator agent",
-    )
 
-    presentation_generator_task = Task(
-        name="Generate Presentation Task",
-        agent=presentation_generation_agent,
-        output_type=OutputType.TEXT,
-        input_type=InputType.TEXT,
-        model=open_ai_model_text,
-        instructions=f"Content: {input_content}, Output Type: {slide_type}. Generate a slide for the given content. Each TEXT block should contain more than 100 words.",
-        log_output=True,
-        enhance_prompt=False,
-    ).execute()
-
-    return presentation_generator_task
-
-
-patterns = {
-    "TEXT": re.compile(r"<TEXT>(.*?)</TEXT>", re.DOTALL),
-    "IMAGE": re.compile(r"<IMAGE>(.*?)</IMAGE>", re.DOTALL),
-    "QUESTION": re.compile(r"<QUESTION>(.*?)</QUESTION>", re.DOTALL),
-    "OPTIONS": re.compile(r"<OPTIONS>(.*?)</OPTIONS>", re.DOTALL),
-    "ANSWER": re.compile(r"<ANSWER>(.*?)</ANSWER>", re.DOTALL),
-    "HEADING": re.compile(r"<HEADING>(.*?)</HEADING>", re.DOTALL),
-}
-
-
-def extract_content(slide_content):
-    extracted_content = {}
-
-    # Extract single occurrences of TEXT, IMAGE, and HEADING
-    for key in ["TEXT", "IMAGE", "HEADING"]:
-        pattern = patterns[key]
-        match = pattern.search(slide_content)
-        if match:
-            extracted_content[key] = match.group(1).strip()
-
-    # Extract multiple occurrences of QUESTION, OPTIONS, and ANSWER
-    for key in ["QUESTION", "OPTIONS", "ANSWER"]:
-        pattern = patterns[key]
-        matches = pattern.findall(slide_content)
-        if matches:
-            extracted_content[key] = [match.strip() for match in matches]
-
-    return extracted_content
-
-
-def search_image_online(prompt):
-    results = DDGS().images(
-        keywords=prompt,
-        region="wt-wt",
-        safesearch="off",
-        size=None,
-        type_image="photo",
-        license_image="share",
-        max_results=1,
-    )
+from deck_pipeline import generate_deck, image_future_for
+from instrumentation import deck
+from response_cache import response_cache
+from slide_generator import slide_fingerprint
+
+
+def render_image(container, image_url):
+    if image_url:
+        container.image(image_url, use_column_width="always")
+    else:
+        container.caption("No image found for this prompt.")
+
+
+def render_resolved_images(pending_images, wait=False):
+    # Fills image placeholders whose lookup has finished, returns the rest
+    remaining = []
+    for placeholder, image_future in pending_images:
+        if wait or image_future.done():
+            render_image(placeholder, image_future.result())
+        else:
+            remaining.append((placeholder, image_future))
+    return remaining
+
+
+def render_slide(container, i, slide, image_future, pending_images):
+    # The image goes into a placeholder queued on pending_images, filled by
+    # render_resolved_images() once its lookup is done
+    if slide.get("error"):
+        container.error(f"Slide {i + 1} could not be generated: {slide['error']}")
+        return
+
+    # Streamed slides are stored even when the model skipped a block
+    heading = slide["generated_content"].get("HEADING", "")
+    text = slide["generated_content"].get("TEXT", "")
+    type = slide["type"]
+
+    image = slide["generated_content"].get("IMAGE")
+    questions = slide["generated_content"].get("QUESTION", [])
+    answers = slide["generated_content"].get("ANSWER", [])
+    options = slide["generated_content"].get("OPTIONS", [])
+
+    container.write(f"# {heading}")
+    container.write(f"### Type - {type}")
+    container.write(text)
+    if image:
+        container.write("IMAGE PROMPT: " + image)
+        pending_images.append((container.empty(), image_future))
+    if questions:
+        container.write("#### QUESTIONS: ")
+        for question in questions:
+            container.write(question)
+    if answers:
+        container.write("#### ANSWERS: ")
+        for answer in answers:
+            container.write(", ".join(answer))
+    if options:
+        container.write("#### OPTIONS: ")
+        for option in options:
+            container.write(", ".join(option))
+
 
-    return results
+def render_timing_panel(title, report):
+    summary = report.to_dict()
+    with st.expander(f"Timings: {title}", expanded=True):
+        st.write(
+            f"Wall time: {summary['wall_seconds']:.2f}s, "
+            f"estimated cost: ${summary['cost_usd']:.4f}"
+        )
+        st.dataframe(summary["stages"], use_container_width=True)
+        st.download_button(
+            "Download report",
+            report.to_json(),
+            file_name=f"{report.deck_id}.json",
+            mime="application/json",
+            key=f"download_{report.deck_id}",
+        )
+
+
+def render_block(container, slide_type, tag, content):
+    if tag == "HEADING":
+        container.write(f"# {content}")
+        container.write(f"### Type - {slide_type}")
+    elif tag == "TEXT":
+        container.write(content)
+    elif tag == "QUESTION":
+        container.write(f"#### {tag}: ")
+        container.write(content)
+    else:
+        container.write(f"#### {tag}: ")
+        container.write(", ".join(content))
 
 
 final_slides = st.session_state.slides
+if "generated_slides" not in st.session_state:
+    # Slide fingerprint -> generated output, kept across reruns and edits
+    st.session_state.generated_slides = {}
+generated_slides = st.session_state.generated_slides
+fingerprints = [slide_fingerprint(slide) for slide in final_slides]
 
+stream_slides = st.toggle("Show slides while they are generated", value=True)
+show_timings = st.sidebar.checkbox("Show timings")
 generate_slides = st.button("Generate Slides")
-output_slides_list = []
 
 # output_slides_list = [{'type': 'Single Choice Quiz', 'generated_content': "<HEADING>Core Values and Communication</HEADING>  \n<TEXT>  \n- **Be Open, Honest, and Constructive**: Emphasizes the importance of transparent and honest communication for personal and company growth. Positive confrontation is encouraged to resolve issues, leading to stronger relationships among colleagues.  \n- **Example**: A scenario where a problem with a colleague's work habits is openly discussed, resulting in improved teamwork and friendship.  \n</TEXT>  \n<QUESTION>What is emphasized as important for personal and company growth?</QUESTION>  \n<OPTIONS>[Transparent and honest communication, Avoiding confrontation, Ignoring issues]</OPTIONS>  \n<ANSWER>{Transparent and honest communication}</ANSWER>"}, {'type': 'Bullet Points', 'generated_content': '<HEADING>Customer Focus and Accountability</HEADING>  \n<TEXT>\n- **Always Focus on Customer Value**: Prioritizing customer needs enhances the product and business. Understanding customer demands leads to greater appreciation from clients.\n- **Be Accountable for What You Do**: Encourages taking initiative to see, own, solve, and do tasks to achieve results. Ownership is highlighted as key to resolving broader issues proactively.\n- **Example**: Taking extra days to solve a pervasive problem in the app, demonstrating proactive problem-solving and ownership.\n</TEXT>  \n<IMAGE>{Illustration of a team working together to solve a customer issue, showcasing accountability and customer focus}</IMAGE>'}, {'type': 'Multiple Choice Quiz', 'generated_content': '<HEADING>Respect and Excellence</HEADING>  \n<TEXT>  \n- **Be Respectful Always**: Stresses the importance of mutual respect in the workplace for a positive environment. Addressing issues directly with individuals can lead to constructive changes.  \n- **Demand Excellence**: Highlights the importance of self-expectation of excellence and the continuous pursuit of quality, especially in response to customer feedback.  \n- **Example**: Improving testing practices after a customer complaint showcases a commitment to excellence and client satisfaction.  \n</TEXT>  \n<QUESTION>Which of the following best describes the importance of mutual respect in the workplace?</QUESTION>  \n<OPTIONS>[It creates a positive environment, It leads to constructive changes, Both of the above]</OPTIONS>  \n<ANSWER>{Both of the above}</ANSWER>  \n\n<QUESTION>What does demanding excellence in the workplace involve?</QUESTION>  \n<OPTIONS>[Self-expectation of excellence, Continuous pursuit of quality, Both of the above]</OPTIONS>  \n<ANSWER>{Both of the above}</ANSWER>  \n\n<QUESTION>How can addressing issues directly with individuals benefit the workplace?</QUESTION>  \n<OPTIONS>[It can lead to constructive changes, It can create conflicts, It has no impact]</OPTIONS>  \n<ANSWER>{It can lead to constructive changes}</ANSWER>  \n\n<QUESTION>What is an example of demonstrating a commitment to excellence?</QUESTION>  \n<OPTIONS>[Ignoring customer complaints, Improving testing practices after a customer complaint, Maintaining the status quo]</OPTIONS>  \n<ANSWER>{Improving testing practices after a customer complaint}</ANSWER>'}, {'type': 'True/False Quiz', 'generated_content': "<HEADING>Continuous Learning and Ownership</HEADING>  \n<TEXT>Continuous learning and ownership are crucial for personal and professional growth. Encouraging learning from various sources, including colleagues, customers, and everyday experiences, fosters a culture of openness and improvement. Being open to correction and learning from mistakes is invaluable. Acting like an owner means taking responsibility and ownership of tasks, promoting a culture where everyone feels involved and invested in the company's success. For example, an employee who proactively resolves a website issue outside their job scope demonstrates true ownership.</TEXT>  \n\n<QUESTION>Continuous learning involves being open to correction and learning from mistakes.</QUESTION>  \n<ANSWER>True</ANSWER>  \n\n<QUESTION>Acting like an owner means only focusing on tasks within your job description.</QUESTION>  \n<ANSWER>False</ANSWER>  \n\n<QUESTION>Proactively resolving issues outside your job scope is an example of ownership.</QUESTION>  \n<ANSWER>True</ANSWER>"}, {'type': 'Fill in the Blank Quiz', 'generated_content': "<HEADING>Generosity and Support</HEADING>\n\n<TEXT>\n- **Give Whenever and Wherever Possible**: It's important to extend help and support in any capacity. Even simple questions can have a significant impact in aiding colleagues. This approach fosters a supportive and collaborative work environment.\n- **Example**: A team member assists another by asking insightful questions. This demonstrates how non-expertise help can lead to solutions, further promoting a culture of generosity and support within the team.\n</TEXT>\n\n<QUESTION>Generosity and support in the workplace can be demonstrated by extending help and support in any capacity, highlighting the impact of even simple _______ in aiding colleagues.</QUESTION> \n\n<ANSWER>questions</ANSWER>\n\n<IMAGE>{Illustration of a team member assisting another by asking questions}</IMAGE>"}]
 # output_slides_list = [
@@ -178,44 +179,94 @@ output_slides_list = []
 #     },
 # ]
 
+# Only new or edited slides, and ones that failed last time, go to the model
+dirty_slides = []
 if generate_slides:
-    for slide in final_slides:
-        generated_slide = generate_slide_content(slide["content"], slide["type"])
-        extracted_content = extract_content(generated_slide)
-        output_dict = {
-            "type": slide["type"],
-            "generated_content": extracted_content,
+    dirty_slides = [
+        i
+        for i, fingerprint in enumerate(fingerprints)
+        if fingerprint not in generated_slides
+        or "error" in generated_slides[fingerprint]
+    ]
+    st.caption(
+        f"Generating {len(dirty_slides)} of {len(final_slides)} slides, "
+        "the rest are unchanged."
+    )
+
+if generate_slides or any(fp in generated_slides for fp in fingerprints):
+    with deck() as slides_report:
+        # Lay out one container per slide up front so slides land in order
+        containers = []
+        for slide in final_slides:
+            containers.append(st.container())
+            st.write("---")
+
+        clean_slides = [
+            i
+            for i, fingerprint in enumerate(fingerprints)
+            if i not in dirty_slides and fingerprint in generated_slides
+        ]
+        # Placeholders for images still being looked up; generating the
+        # changed slides does not wait for them
+        pending_images = []
+        for i in clean_slides:
+            slide = generated_slides[fingerprints[i]]
+            render_slide(
+                containers[i], i, slide, image_future_for(slide), pending_images
+            )
+
+        dirty_input = [final_slides[i] for i in dirty_slides]
+
+        def render_streamed_block(j, tag, content, image_future):
+            i = dirty_slides[j]
+            if tag == "ERROR":
+                containers[i].error(f"Slide {i + 1} could not be generated: {content}")
+            elif tag == "IMAGE":
+                # The lookup and download have started, fill the placeholder
+                # when done
+                containers[i].write("IMAGE PROMPT: " + content)
+                pending_images.append((containers[i].empty(), image_future))
+            else:
+                render_block(containers[i], final_slides[i]["type"], tag, content)
+            pending_images[:] = render_resolved_images(pending_images)
+
+        if dirty_slides:
+            outputs, image_futures = generate_deck(
+                dirty_input,
+                stream=stream_slides,
+                on_block=render_streamed_block if stream_slides else None,
+            )
+            for i, output_dict in zip(dirty_slides, outputs):
+                generated_slides[fingerprints[i]] = output_dict
+
+            if not stream_slides:
+                for j, i in enumerate(dirty_slides):
+                    render_slide(
+                        containers[i],
+                        i,
+                        generated_slides[fingerprints[i]],
+                        image_futures.get(j),
+                        pending_images,
+                    )
+        render_resolved_images(pending_images, wait=True)
+
+        # Forget outputs for slides that no longer exist in the deck
+        st.session_state.generated_slides = {
+            fp: generated_slides[fp] for fp in fingerprints if fp in generated_slides
         }
-        output_slides_list.append(output_dict)
-
-    for slide in output_slides_list:
-        heading = slide["generated_content"]["HEADING"]
-        text = slide["generated_content"]["TEXT"]
-        type = slide["type"]
-
-        image = slide["generated_content"].get("IMAGE")
-        questions = slide["generated_content"].get("QUESTION", [])
-        answers = slide["generated_content"].get("ANSWER", [])
-        options = slide["generated_content"].get("OPTIONS", [])
-
-        st.write(f"# {heading}")
-        st.write(f"### Type - {type}")
-        st.write(text)
-        if image:
-            st.write("IMAGE PROMPT: " + image)
-            image_result = search_image_online(image)
-            image_url = image_result[0]["image"]
-            st.image(image_url, use_column_width="always")
-        if questions:
-            st.write("#### QUESTIONS: ")
-            for question in questions:
-                st.write(question)
-        if answers:
-            st.write("#### ANSWERS: ")
-            for answer in answers:
-                st.write(answer)
-        if options:
-            st.write("#### OPTIONS: ")
-            for option in options:
-                st.write(option)
-        st.write("---")
+
+    if generate_slides:
+        st.session_state.slides_report = slides_report
+
+if show_timings:
+    cache_stats = response_cache.stats()
+    st.caption(
+        f"Response cache: {cache_stats['hits']} hits, "
+        f"{cache_stats['misses']} misses since the app started"
+    )
+    for title, key in [
+        ("upload and summary", "summary_report"),
+        ("slide generation", "slides_report"),
+    ]:
+        if key in st.session_state:
+            render_timing_panel(title, st.session_state[key])
@@ -0,0 +1,369 @@
+import contextvars
+import heapq
+import itertools
+import json
+import os
+import random
+import threading
+import time
+import urllib.parse
+from contextlib import contextmanager
+
+import openai
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: no flock, so the budgets stay per process
+    fcntl = None
+
+from instrumentation import annotate
+
+# Calls for someone waiting on a page go ahead of queued service jobs, in
+# this process and in every other process sharing RATE_LIMIT_STATE_DIR
+INTERACTIVE = 0
+BATCH = 1
+
+# Per-model limits; override with a JSON object of the same shape, e.g.
+# OPENAI_MODEL_BUDGETS='{"gpt-4o": {"requests_per_minute": 5000, ...}}'
+MODEL_BUDGETS = {
+    "gpt-4-turbo-preview": {"requests_per_minute": 500, "tokens_per_minute": 30000},
+    "gpt-4o": {"requests_per_minute": 500, "tokens_per_minute": 30000},
+}
+MODEL_BUDGETS.update(json.loads(os.getenv("OPENAI_MODEL_BUDGETS", "{}")))
+DEFAULT_BUDGET = {"requests_per_minute": 500, "tokens_per_minute": 30000}
+
+# Seconds a single call may take. Unless OPENAI_REQUEST_TIMEOUT fixes it, a
+# call gets long enough to generate max_tokens at MIN_TOKENS_PER_SECOND, and
+# never less than MIN_REQUEST_TIMEOUT; a cut-off call is paid for and retried
+# from scratch, so this errs long.
+REQUEST_TIMEOUT = float(os.getenv("OPENAI_REQUEST_TIMEOUT", 0)) or None
+MIN_REQUEST_TIMEOUT = 120
+MIN_TOKENS_PER_SECOND = float(os.getenv("OPENAI_MIN_TOKENS_PER_SECOND", 10))
+DEFAULT_MAX_TOKENS = 4096
+# Seconds a call may spend queued, retrying and backing off before its error
+# is raised; always stretched to fit two full attempts
+REQUEST_DEADLINE = float(os.getenv("OPENAI_REQUEST_DEADLINE", 300))
+BACKOFF_BASE = float(os.getenv("OPENAI_BACKOFF_BASE", 1))
+BACKOFF_MAX = float(os.getenv("OPENAI_BACKOFF_MAX", 30))
+
+# The Streamlit app and the service run as separate processes against the
+# same provider limits, so the budgets live in one locked file per model.
+# Set to an empty string to keep them per process.
+RATE_LIMIT_STATE_DIR = os.getenv(
+    "RATE_LIMIT_STATE_DIR", os.path.join(".cache", "rate_limits")
+)
+# Seconds between checks on budget that another process may have freed, and
+# how long a waiting interactive call keeps other processes' batch calls back
+# after its last check
+RATE_LIMIT_POLL_INTERVAL = float(os.getenv("RATE_LIMIT_POLL_INTERVAL", 0.25))
+INTERACTIVE_HOLD = 4 * RATE_LIMIT_POLL_INTERVAL
+
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+)
+
+_priority = contextvars.ContextVar("request_priority", default=INTERACTIVE)
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+@contextmanager
+def priority(level):
+    # Model calls made in this context, including on pools started through
+    # instrumentation.submit(), are queued at this priority
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def request_timeout(max_tokens):
+    if REQUEST_TIMEOUT:
+        return REQUEST_TIMEOUT
+    return max(
+        MIN_REQUEST_TIMEOUT, (max_tokens or DEFAULT_MAX_TOKENS) / MIN_TOKENS_PER_SECOND
+    )
+
+
+def estimate_tokens(messages, max_tokens):
+    # About four characters per token, plus the completion the request may use
+    prompt_chars = sum(len(message.get("content") or "") for message in messages)
+    return prompt_chars // 4 + (max_tokens or 0)
+
+
+class ModelBudget:
+    # Token buckets for requests and tokens per minute, refilled continuously.
+    # Times are wall clock seconds so the state can be shared by processes.
+    def __init__(self, requests_per_minute, tokens_per_minute):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.requests = float(requests_per_minute)
+        self.tokens = float(tokens_per_minute)
+        self.paused_until = 0.0
+        # pid -> time until which that process has an interactive call waiting
+        self.interactive_waiting = {}
+        self._updated = time.time()
+
+    def load(self, state):
+        # Takes over the state another process saved, keeping this process's
+        # limits
+        self.requests = state.get("requests", self.requests)
+        self.tokens = state.get("tokens", self.tokens)
+        self.paused_until = state.get("paused_until", self.paused_until)
+        self.interactive_waiting = state.get(
+            "interactive_waiting", self.interactive_waiting
+        )
+        self._updated = state.get("updated", self._updated)
+
+    def dump(self):
+        now = time.time()
+        return {
+            "requests": self.requests,
+            "tokens": self.tokens,
+            "paused_until": self.paused_until,
+            "interactive_waiting": {
+                pid: until
+                for pid, until in self.interactive_waiting.items()
+                if until > now
+            },
+            "updated": self._updated,
+        }
+
+    def _refill(self, now):
+        elapsed = max(0.0, now - self._updated)
+        self._updated = max(self._updated, now)
+        self.requests = min(
+            self.requests_per_minute,
+            self.requests + elapsed * self.requests_per_minute / 60,
+        )
+        self.tokens = min(
+            self.tokens_per_minute,
+            self.tokens + elapsed * self.tokens_per_minute / 60,
+        )
+
+    def wait_time(self, tokens, now):
+        # Seconds until a call of this many tokens fits, 0 if it fits now. A
+        # call bigger than the whole bucket waits for a full bucket.
+        self._refill(now)
+        tokens = min(tokens, self.tokens_per_minute)
+        waits = [self.paused_until - now]
+        if self.requests < 1:
+            waits.append((1 - self.requests) * 60 / self.requests_per_minute)
+        if self.tokens < tokens:
+            waits.append((tokens - self.tokens) * 60 / self.tokens_per_minute)
+        return max(0.0, *waits)
+
+    def take(self, tokens):
+        self.requests -= 1
+        self.tokens -= min(tokens, self.tokens_per_minute)
+
+    def settle(self, reserved, used):
+        # Give back what an estimate over-reserved, or charge what it missed
+        self.tokens = min(self.tokens_per_minute, self.tokens + reserved - used)
+
+    def interactive_elsewhere(self, now):
+        pid = str(os.getpid())
+        return any(
+            until > now
+            for other, until in self.interactive_waiting.items()
+            if other != pid
+        )
+
+    def mark_interactive(self, until):
+        # Records whether this process has an interactive call waiting
+        if until is None:
+            self.interactive_waiting.pop(str(os.getpid()), None)
+        else:
+            self.interactive_waiting[str(os.getpid())] = until
+
+
+class RequestScheduler:
+    # Shared by every model call in the process, and through state_dir with
+    # the other processes on the machine. Calls wait in a per-model priority
+    # queue until the model's request and token budgets allow them, and batch
+    # calls also wait while another process has an interactive call waiting;
+    # a 429 pauses that model for everyone, and failed calls are retried with
+    # jittered exponential backoff until their deadline.
+    def __init__(
+        self,
+        budgets=MODEL_BUDGETS,
+        default_budget=DEFAULT_BUDGET,
+        deadline=REQUEST_DEADLINE,
+        backoff_base=BACKOFF_BASE,
+        backoff_max=BACKOFF_MAX,
+        state_dir=RATE_LIMIT_STATE_DIR,
+        poll_interval=RATE_LIMIT_POLL_INTERVAL,
+    ):
+        self.budgets = budgets
+        self.default_budget = default_budget
+        self.deadline = deadline
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        # Without fcntl the budgets cannot be shared, so each process has its own
+        self.state_dir = state_dir if fcntl else None
+        self.poll_interval = poll_interval
+        self._condition = threading.Condition()
+        self._models = {}
+        self._waiting = {}
+        self._order = itertools.count()
+        if self.state_dir:
+            os.makedirs(self.state_dir, exist_ok=True)
+
+    def _budget(self, model):
+        if model not in self._models:
+            limits = self.budgets.get(model, self.default_budget)
+            self._models[model] = ModelBudget(**limits)
+            self._waiting[model] = []
+        return self._models[model]
+
+    @contextmanager
+    def _shared(self, model):
+        # The model's budget as every process left it, saved back when the
+        # block exits. Called with self._condition held.
+        budget = self._budget(model)
+        if not self.state_dir:
+            yield budget
+            return
+        path = os.path.join(
+            self.state_dir, f"{urllib.parse.quote(model, safe='')}.json"
+        )
+        with open(path, "a+") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                try:
+                    budget.load(json.loads(f.read() or "{}"))
+                except json.JSONDecodeError:
+                    pass
+                yield budget
+                f.seek(0)
+                f.truncate()
+                json.dump(budget.dump(), f)
+                f.flush()
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def acquire(self, model, tokens, deadline):
+        # Blocks until this call is first in its model's queue and fits the
+        # budget; returns the seconds it waited
+        started = time.monotonic()
+        level = _priority.get()
+        ticket = (level, next(self._order))
+        with self._condition:
+            self._budget(model)
+            waiting = self._waiting[model]
+            heapq.heappush(waiting, ticket)
+            try:
+                while True:
+                    with self._shared(model) as budget:
+                        now = time.time()
+                        wait = budget.wait_time(tokens, now)
+                        if level > INTERACTIVE and budget.interactive_elsewhere(now):
+                            wait = max(wait, self.poll_interval)
+                        ready = waiting[0] == ticket and wait == 0
+                        if ready:
+                            budget.take(tokens)
+                        interactive = any(
+                            other[0] == INTERACTIVE
+                            for other in waiting
+                            if not (ready and other == ticket)
+                        )
+                        budget.mark_interactive(
+                            now + INTERACTIVE_HOLD if interactive else None
+                        )
+                    now = time.monotonic()
+                    if ready:
+                        return now - started
+                    if now >= deadline:
+                        raise DeadlineExceeded(
+                            f"{model} request waited {now - started:.1f}s for "
+                            "rate limit budget"
+                        )
+                    if waiting[0] != ticket:
+                        # Woken when the head of the queue is let through
+                        wait = deadline - now
+                    elif self.state_dir:
+                        # Other processes may free or take budget meanwhile
+                        wait = min(wait, self.poll_interval)
+                    self._condition.wait(min(wait, deadline - now))
+            finally:
+                waiting.remove(ticket)
+                heapq.heapify(waiting)
+                self._condition.notify_all()
+
+    def settle(self, model, reserved, used):
+        with self._condition:
+            with self._shared(model) as budget:
+                budget.settle(reserved, used)
+            self._condition.notify_all()
+
+    def _pause(self, model, seconds):
+        with self._condition:
+            with self._shared(model) as budget:
+                budget.paused_until = max(budget.paused_until, time.time() + seconds)
+
+    def _backoff(self, attempt, error):
+        # Full jitter, but never sooner than the server asked for
+        delay = random.uniform(
+            0, min(self.backoff_max, self.backoff_base * 2**attempt)
+        )
+        response = getattr(error, "response", None)
+        retry_after = None
+        if response is not None:
+            retry_after = response.headers.get("retry-after")
+        try:
+            delay = max(delay, float(retry_after))
+        except (TypeError, ValueError):
+            pass
+        return delay
+
+    def run(self, model, tokens, function, deadline=None, timeout=None):
+        # Calls function once the budget allows it, retrying retryable errors
+        # until the deadline, which leaves room for at least two attempts of
+        # timeout seconds. If the result reports its usage, the unused part of
+        # the token reservation is returned to the budget.
+        deadline = deadline or self.deadline
+        if timeout:
+            deadline = max(deadline, 2 * timeout + self.backoff_max)
+        deadline = time.monotonic() + deadline
+        queued_seconds = 0.0
+        for attempt in itertools.count():
+            queued_seconds += self.acquire(model, tokens, deadline)
+            try:
+                result = function()
+            except RETRYABLE_ERRORS as e:
+                self.settle(model, tokens, 0)
+                if getattr(e, "code", None) == "insufficient_quota":
+                    # Out of credit rather than over the rate limit, retrying
+                    # cannot succeed
+                    annotate(retries=attempt, queued_seconds=queued_seconds)
+                    raise
+                delay = self._backoff(attempt, e)
+                if isinstance(e, openai.RateLimitError):
+                    self._pause(model, delay)
+                if time.monotonic() + delay >= deadline:
+                    annotate(retries=attempt, queued_seconds=queued_seconds)
+                    raise
+                time.sleep(delay)
+                continue
+            except Exception:
+                # Rejected before generating anything, give the tokens back
+                self.settle(model, tokens, 0)
+                annotate(retries=attempt, queued_seconds=queued_seconds)
+                raise
+
+            usage = getattr(result, "usage", None)
+            if usage is not None:
+                self.settle(model, tokens, usage.total_tokens)
+            annotate(retries=attempt, queued_seconds=queued_seconds)
+            return result
+
+
+request_scheduler = RequestScheduler()
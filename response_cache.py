@@ -0,0 +1,117 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+RESPONSE_CACHE_DIR = os.getenv(
+    "RESPONSE_CACHE_DIR", os.path.join(".cache", "responses")
+)
+# Defaults: 50 MB on disk, entries expire after 7 days
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", 50 * 1024**2))
+RESPONSE_CACHE_MAX_AGE = int(os.getenv("RESPONSE_CACHE_MAX_AGE", 7 * 24 * 60 * 60))
+
+
+def hash_file(file_path):
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def make_cache_key(*parts):
+    # Parts may be strings or JSON-serializable objects such as model parameters
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class ResponseCache:
+    def __init__(
+        self,
+        cache_dir=RESPONSE_CACHE_DIR,
+        max_bytes=RESPONSE_CACHE_MAX_BYTES,
+        max_age=RESPONSE_CACHE_MAX_AGE,
+    ):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key):
+        path = self._path(key)
+        with self._lock:
+            try:
+                with open(path, "r") as f:
+                    entry = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                self.misses += 1
+                return None
+
+            if time.time() - entry["created"] > self.max_age:
+                _remove(path)
+                self.misses += 1
+                return None
+
+            # Touch the entry so size eviction drops the least recently used first
+            try:
+                os.utime(path)
+            except FileNotFoundError:
+                # Evicted by another process after it was read
+                pass
+            self.hits += 1
+            return entry["value"]
+
+    def set(self, key, value):
+        path = self._path(key)
+        entry = {"created": time.time(), "value": value}
+        with self._lock:
+            # The app and the service share the directory
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, path)
+            self._evict()
+
+    def _evict(self):
+        now = time.time()
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                # Another process evicted it first
+                continue
+            if now - stat.st_mtime > self.max_age:
+                _remove(path)
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_size <= self.max_bytes:
+                break
+            _remove(path)
+            total_size -= size
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses}
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,214 @@
+# Headless deck generation: summary -> slides -> images as queued jobs.
+#
+#   uvicorn service:app
+#
+# Jobs live in memory, so run a single uvicorn process and scale with
+# SERVICE_WORKERS instead.
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import List
+
+from fastapi import FastAPI, File, Form, HTTPException, UploadFile
+from fastapi.responses import PlainTextResponse
+
+from deck_pipeline import generate_deck
+from instrumentation import deck, metrics
+from request_scheduler import BATCH, priority
+from response_cache import response_cache
+from slide_generator import OUTPUT_TYPES
+from summarizer import generate_summary, split_summary
+from upload_registry import upload_registry
+
+SERVICE_WORKERS = int(os.getenv("SERVICE_WORKERS", 4))
+MAX_QUEUED_JOBS = int(os.getenv("MAX_QUEUED_JOBS", 1000))
+# Finished jobs are dropped this many seconds after they complete
+JOB_RETENTION = int(os.getenv("JOB_RETENTION", 60 * 60))
+
+logger = logging.getLogger(__name__)
+
+
+class DeckJobQueue:
+    def __init__(
+        self,
+        workers=SERVICE_WORKERS,
+        max_queued=MAX_QUEUED_JOBS,
+        retention=JOB_RETENTION,
+    ):
+        self.workers = workers
+        self.retention = retention
+        self._queue = queue.Queue(maxsize=max_queued)
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def start(self):
+        for i in range(self.workers - len(self._threads)):
+            thread = threading.Thread(
+                target=self._work, name=f"deck-worker-{i}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, file_path, number_of_slides, slide_types, resolve_images):
+        self._prune()
+        job = {
+            "job_id": uuid.uuid4().hex,
+            "status": "queued",
+            "file_path": file_path,
+            "number_of_slides": number_of_slides,
+            "slide_types": slide_types,
+            "resolve_images": resolve_images,
+            "created": time.time(),
+            "finished": None,
+            "error": None,
+            "slides": None,
+            "report": None,
+        }
+        with self._lock:
+            self._jobs[job["job_id"]] = job
+        try:
+            self._queue.put_nowait(job["job_id"])
+        except queue.Full:
+            with self._lock:
+                del self._jobs[job["job_id"]]
+            raise
+        return dict(job)
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def list(self):
+        with self._lock:
+            return [
+                {"job_id": job["job_id"], "status": job["status"]}
+                for job in self._jobs.values()
+            ]
+
+    def _update(self, job_id, **fields):
+        with self._lock:
+            self._jobs[job_id].update(fields)
+
+    def _prune(self):
+        now = time.time()
+        with self._lock:
+            for job_id, job in list(self._jobs.items()):
+                if job["finished"] and now - job["finished"] > self.retention:
+                    del self._jobs[job_id]
+
+    def _work(self):
+        while True:
+            job_id = self._queue.get()
+            # Model calls for queued jobs wait behind the interactive app's
+            with deck(job_id) as report, priority(BATCH):
+                try:
+                    self._run(self.get(job_id))
+                    status, error = "done", None
+                except Exception as e:
+                    status, error = "failed", str(e)
+            try:
+                report.save()
+            except OSError as e:
+                logger.warning("Could not save the report for job %s: %s", job_id, e)
+            self._update(
+                job_id,
+                status=status,
+                error=error,
+                report=report.to_dict(),
+                finished=time.time(),
+            )
+            self._queue.task_done()
+
+    def _run(self, job):
+        job_id = job["job_id"]
+        self._update(job_id, status="summarizing")
+        summarized_content = generate_summary(
+            job["file_path"], job["number_of_slides"]
+        )
+        slide_types = job["slide_types"]
+        slides = [
+            {"content": content, "type": slide_types[i % len(slide_types)]}
+            for i, content in enumerate(split_summary(summarized_content))
+        ]
+
+        self._update(job_id, status="generating")
+        # Clients get the image urls, there is no page to serve local copies
+        output_slides_list, image_futures = generate_deck(
+            slides, images=job["resolve_images"], localize=False
+        )
+
+        if image_futures:
+            self._update(job_id, status="resolving_images")
+            for i, image_future in image_futures.items():
+                output_slides_list[i]["image_url"] = image_future.result()
+
+        self._update(job_id, slides=output_slides_list)
+
+
+deck_jobs = DeckJobQueue()
+
+
+@asynccontextmanager
+async def lifespan(app):
+    deck_jobs.start()
+    yield
+
+
+app = FastAPI(title="Slide Generator", lifespan=lifespan)
+
+
+@app.post("/jobs", status_code=202)
+def create_job(
+    file: UploadFile = File(...),
+    number_of_slides: int = Form(3, ge=1, le=5),
+    slide_types: List[str] = Form(["Bullet Points"]),
+    resolve_images: bool = Form(True),
+):
+    unknown_types = [t for t in slide_types if t not in OUTPUT_TYPES]
+    if unknown_types:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Unknown slide types {unknown_types}, expected {OUTPUT_TYPES}",
+        )
+
+    # A plain def, so FastAPI runs the file write and the OpenAI deletes of
+    # expired uploads in its threadpool rather than on the event loop
+    upload_registry.expire()
+    saved_file_path, _ = upload_registry.save_upload(
+        os.path.basename(file.filename or "upload"), file.file.read()
+    )
+    try:
+        job = deck_jobs.submit(
+            saved_file_path, number_of_slides, slide_types, resolve_images
+        )
+    except queue.Full:
+        raise HTTPException(status_code=503, detail="Job queue is full")
+    return {"job_id": job["job_id"], "status": job["status"]}
+
+
+@app.get("/jobs")
+def list_jobs():
+    return deck_jobs.list()
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    lines = []
+    for result, count in response_cache.stats().items():
+        name = f"slide_generator_response_cache_{result}_total"
+        lines += [f"# TYPE {name} counter", f"{name} {count}"]
+    return metrics.prometheus_text() + "\n".join(lines) + "\n"
+
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    job = deck_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
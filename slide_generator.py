@@ -0,0 +1,186 @@
+import os
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from dotenv import load_dotenv
+from lyzr_automata import Agent, Task
+from lyzr_automata.tasks.task_literals import InputType, OutputType
+
+import instrumentation
+from instrumentation import annotate, instrumented, span
+from llm import OpenAIChatModel
+from response_cache import make_cache_key, response_cache
+from slide_parser import SlideStreamParser
+
+load_dotenv()
+
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+MAX_CONCURRENT_SLIDES = int(os.getenv("MAX_CONCURRENT_SLIDES", "5"))
+
+OUTPUT_TYPES = [
+    "Bullet Points",
+    "Single Choice Quiz",
+    "Multiple Choice Quiz",
+    "True/False Quiz",
+    "Fill in the Blank Quiz",
+]
+
+open_ai_model_text = OpenAIChatModel(
+    api_key=OPENAI_API_KEY,
+    parameters={
+        "model": "gpt-4o",
+        "temperature": 0.2,
+        "max_tokens": 1500,
+    },
+)
+
+
+# ["Bullet Points","Single Choice Quiz","Multiple Choice Quiz","True/False Quiz","Fill in the Blank Quiz"]
+SLIDE_PERSONA = """You are a slide generator agent that can generate interactive slide for a presentation on a given topic for a Learning management system. You have following output formats:
+    1. Bullet Points - Format - <TEXT>5 bullet points</TEXT> <IMAGE>Query to search the internet for a suitable image</IMAGE>
+    2. Single Choice Quiz - Format - <QUESTION>Generated question</QUESTION> <OPTIONS>[Option1, Option2, Option3]</OPTIONS> <ANSWER>Option1</ANSWER>
+    3. Multiple Choice Quiz - Format - <QUESTION>Generated question</QUESTION> <OPTIONS>[Option1, Option2, Option3]</OPTIONS> <ANSWER>{Option1, Option 2</ANSWER>
+    4. True/False Quiz - Format - <QUESTION>Generated question</QUESTION> <ANSWER>True/False</ANSWER>
+    5. Fill in the blank Quiz - Format - <QUESTION>Generated question</QUESTION> <ANSWER>Fill in the blank</ANSWER>
+
+    Single Choice Quiz has only 1 correct answer, Multiple Choice Quiz has more than 1 correct answers.
+    Each output format should contain a heading and a text - <HEADING>Slide Heading</HEADING> <TEXT>3 bullet points</TEXT>
+    Generate TEXT in a way it explains the content in an easy to understand way, with more words. Feel free to use your creativity to expand on the topic/content. Generate enough Quiz questions to cover the topic/content.
+"""
+
+
+SLIDE_ROLE = "Presentation generator agent"
+
+
+def slide_instructions(input_content, slide_type):
+    return f"Content: {input_content}, Output Type: {slide_type}. Generate a slide for the given content. Each TEXT block should contain more than 100 words."
+
+
+def slide_fingerprint(slide):
+    return make_cache_key(slide["content"], slide["type"])
+
+
+@instrumented("generate_slide")
+def generate_slide_content(input_content, slide_type):
+    instructions = slide_instructions(input_content, slide_type)
+    cache_key = make_cache_key(
+        SLIDE_PERSONA, instructions, open_ai_model_text.parameters
+    )
+    cached_slide = response_cache.get(cache_key)
+    annotate(slide_type=slide_type, cache_hit=cached_slide is not None)
+    if cached_slide is not None:
+        return cached_slide
+
+    presentation_generation_agent = Agent(
+        prompt_persona=SLIDE_PERSONA,
+        role=SLIDE_ROLE,
+    )
+
+    presentation_generator_task = Task(
+        name="Generate Presentation Task",
+        agent=presentation_generation_agent,
+        output_type=OutputType.TEXT,
+        input_type=InputType.TEXT,
+        model=open_ai_model_text,
+        instructions=instructions,
+        log_output=True,
+        enhance_prompt=False,
+    ).execute()
+
+    response_cache.set(cache_key, presentation_generator_task)
+    return presentation_generator_task
+
+
+def generate_slides_concurrently(slides, max_workers=MAX_CONCURRENT_SLIDES):
+    # Results keep the input slide order; a failed slide only records its error
+    results = [None] * len(slides)
+    if not slides:
+        return results
+
+    max_workers = max(1, min(max_workers, len(slides)))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            instrumentation.submit(
+                executor, generate_slide_content, slide["content"], slide["type"]
+            ): i
+            for i, slide in enumerate(slides)
+        }
+        for future in as_completed(futures):
+            i = futures[future]
+            try:
+                results[i] = {"generated_slide": future.result(), "error": None}
+            except Exception as e:
+                results[i] = {"generated_slide": None, "error": str(e)}
+
+    return results
+
+
+def stream_slide_content(input_content, slide_type):
+    # Same prompt as generate_slide_content, but yields tokens as they arrive
+    instructions = slide_instructions(input_content, slide_type)
+    cache_key = make_cache_key(
+        SLIDE_PERSONA, instructions, open_ai_model_text.parameters
+    )
+    cached_slide = response_cache.get(cache_key)
+    annotate(slide_type=slide_type, cache_hit=cached_slide is not None)
+    if cached_slide is not None:
+        yield cached_slide
+        return
+
+    # Mirrors the messages lyzr_automata's Task builds for a text task
+    messages = [
+        {
+            "role": "system",
+            "content": f"In your role as {SLIDE_ROLE}, you embody a persona defined by {SLIDE_PERSONA}.",
+        },
+        {
+            "role": "user",
+            "content": f"Now execute these instructions: {instructions}.  Input: None ",
+        },
+    ]
+    parts = []
+    for delta in open_ai_model_text.stream_text(messages):
+        parts.append(delta)
+        yield delta
+
+    response_cache.set(cache_key, "".join(parts))
+
+
+def stream_slides_concurrently(slides, max_workers=MAX_CONCURRENT_SLIDES):
+    # Yields (slide index, tag, content) as soon as any slide completes a block.
+    # Workers only parse; all rendering stays on the Streamlit script thread.
+    if not slides:
+        return
+
+    events = queue.Queue()
+
+    def stream_slide(i, slide):
+        parser = SlideStreamParser()
+        try:
+            with span("generate_slide", streamed=True) as record:
+                for delta in stream_slide_content(slide["content"], slide["type"]):
+                    for tag, content in parser.feed(delta):
+                        record.setdefault(
+                            "first_block_seconds", time.time() - record["start"]
+                        )
+                        events.put((i, tag, content))
+                for tag, content in parser.close():
+                    events.put((i, tag, content))
+        except Exception as e:
+            events.put((i, "ERROR", str(e)))
+        finally:
+            events.put((i, None, None))
+
+    max_workers = max(1, min(max_workers, len(slides)))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for i, slide in enumerate(slides):
+            instrumentation.submit(executor, stream_slide, i, slide)
+
+        remaining = len(slides)
+        while remaining:
+            i, tag, content = events.get()
+            if tag is None:
+                remaining -= 1
+                continue
+            yield i, tag, content
@@ -0,0 +1,196 @@
+import re
+
+SLIDE_TAGS = ("HEADING", "TEXT", "IMAGE", "QUESTION", "OPTIONS", "ANSWER")
+# HEADING, TEXT and IMAGE appear once per slide, the quiz tags can repeat
+SINGLE_TAGS = ("HEADING", "TEXT", "IMAGE")
+# Longest "</QUESTION>" plus some room for stray whitespace inside the brackets
+MAX_TAG_LENGTH = max(len(tag) for tag in SLIDE_TAGS) + 8
+TAG_NAMES = "|".join(SLIDE_TAGS)
+# One alternation over every opening and closing tag, so a response is
+# tokenized in a single scan instead of one scan per tag
+TAG_PATTERN = re.compile(r"<\s*(/?)\s*(" + TAG_NAMES + r")\s*>", re.IGNORECASE)
+# The same tags, capturing only the names of opening tags: splitting on it
+# makes two parts per tag instead of three, and closing tags come out as None
+OPENING_TAG_PATTERN = re.compile(
+    r"<\s*(?:/\s*(?:" + TAG_NAMES + r")|(" + TAG_NAMES + r"))\s*>", re.IGNORECASE
+)
+
+
+def split_options(options):
+    # "[Option1, Option2, Option3]" -> ["Option1", "Option2", "Option3"]
+    return list(filter(None, map(str.strip, options.strip("[]{} \n").split(","))))
+
+
+def split_answer(answer, options=None):
+    # Answers come as "Option1", "{Option1, Option 2}", "{Option1, Option 2" or
+    # "True"; match them against the question's options where we have them
+    answer = answer.strip()
+    stripped = answer.strip("[]{}").strip()
+    bracketed = len(stripped) != len(answer)
+    answer = stripped
+    if not options:
+        return split_options(answer) if bracketed else [answer]
+    if answer in options:
+        return [answer]
+
+    pieces = split_options(answer)
+    if all(piece in options for piece in pieces):
+        return pieces
+    return match_options(answer, options) or pieces
+
+
+def match_options(answer, options):
+    # Options named in the answer as whole words, longest first so an option
+    # inside a longer one ("Java" in "JavaScript", "1" in "10") is not counted
+    taken = []
+    for option in sorted(options, key=len, reverse=True):
+        pattern = r"(?<!\w)" + re.escape(option) + r"(?!\w)"
+        for match in re.finditer(pattern, answer):
+            start, end = match.span()
+            overlaps = any(
+                start < taken_end and taken_start < end
+                for taken_start, taken_end in taken
+            )
+            if not overlaps:
+                taken.append((start, end))
+                break
+    matched = {answer[start:end] for start, end in taken}
+    return [option for option in options if option in matched]
+
+
+def add_block(slide_record, tag, content):
+    # Adds one parsed block to the slide record and returns the stored value
+    if tag in SINGLE_TAGS:
+        if tag == "IMAGE":
+            content = content.strip("{}").strip()
+        return slide_record.setdefault(tag, content)
+
+    if tag == "OPTIONS":
+        content = split_options(content)
+    elif tag == "ANSWER":
+        # The n-th answer belongs to the n-th question and its options
+        i = len(slide_record.get("ANSWER", []))
+        options = slide_record.get("OPTIONS", [])
+        content = split_answer(content, options[i] if i < len(options) else None)
+    slide_record.setdefault(tag, []).append(content)
+    return content
+
+
+class SlideStreamParser:
+    # Single-pass parser for the <TAG>...</TAG> slide protocol. feed() takes
+    # text as it arrives and returns the blocks completed so far as
+    # (tag, content) pairs. Tag names are matched case-insensitively, an
+    # unclosed tag ends at the next slide tag, and stray closing tags are
+    # ignored.
+    def __init__(self):
+        self._pending = ""
+        self._open_tag = None
+        self._content = []
+
+    def feed(self, text):
+        text = self._pending + text
+        # Hold back a tag that may be split across two feeds
+        tail = text.rfind("<", max(0, len(text) - MAX_TAG_LENGTH))
+        if tail != -1 and ">" not in text[tail:]:
+            text, self._pending = text[:tail], text[tail:]
+        else:
+            self._pending = ""
+        return self._scan(text)
+
+    def close(self):
+        blocks = self._scan(self._pending)
+        if self._open_tag is not None:
+            self._emit(blocks)
+        self.__init__()
+        return blocks
+
+    def _scan(self, text):
+        # split() returns [text, "/" or "", tag, text, "/" or "", tag, text, ...]
+        parts = TAG_PATTERN.split(text)
+        blocks = []
+        if self._open_tag is not None:
+            self._content.append(parts[0])
+            if len(parts) > 1:
+                self._emit(blocks)
+
+        open_tag, open_tag_content = None, ""
+        for closing, tag, segment in zip(parts[1::3], parts[2::3], parts[3::3]):
+            if open_tag is not None:
+                content = open_tag_content.strip()
+                if content:
+                    blocks.append((open_tag, content))
+                open_tag = None
+            if not closing:
+                open_tag, open_tag_content = tag.upper(), segment
+
+        # The last tag may still be open; keep collecting into it on later feeds
+        if open_tag is not None:
+            self._open_tag = open_tag
+            self._content = [open_tag_content]
+        return blocks
+
+    def _emit(self, blocks):
+        content = "".join(self._content).strip()
+        if content:
+            blocks.append((self._open_tag, content))
+        self._open_tag = None
+        self._content = []
+
+
+def extract_content(slide_content):
+    # Same blocks as SlideStreamParser over the whole text: every opening tag
+    # runs up to the next tag of any kind. add_block() is inlined here, this
+    # is the hot path for long quizzes: blocks are collected in one pass and
+    # the quiz blocks normalized in bulk afterwards.
+    parts = OPENING_TAG_PATTERN.split(slide_content)
+    extracted_content = {}
+    questions, raw_options, raw_answers = [], [], []
+    quiz_blocks = {
+        "QUESTION": questions,
+        "OPTIONS": raw_options,
+        "ANSWER": raw_answers,
+    }
+    for tag, content in zip(parts[1::2], parts[2::2]):
+        if tag is None:
+            continue
+        blocks = quiz_blocks.get(tag)
+        if blocks is None:
+            tag = tag.upper()
+            blocks = quiz_blocks.get(tag)
+        content = content.strip()
+        if not content:
+            continue
+        if blocks is not None:
+            blocks.append(content)
+        elif tag == "IMAGE":
+            extracted_content.setdefault(tag, content.strip("{}").strip())
+        else:
+            extracted_content.setdefault(tag, content)
+
+    # split_options() and split_answer() without a call per block; an answer
+    # that is exactly one of its options skips the matching
+    options = [
+        [
+            option
+            for option in map(str.strip, block.strip("[]{} \n").split(","))
+            if option
+        ]
+        for block in raw_options
+    ]
+    answers = []
+    for i, block in enumerate(raw_answers):
+        block_options = options[i] if i < len(options) else None
+        answer = block.strip("[]{}").strip()
+        if block_options and answer in block_options:
+            answers.append([answer])
+        else:
+            answers.append(split_answer(block, block_options))
+
+    for tag, blocks in [
+        ("QUESTION", questions),
+        ("OPTIONS", options),
+        ("ANSWER", answers),
+    ]:
+        if blocks:
+            extracted_content[tag] = blocks
+    return extracted_content
@@ -0,0 +1,239 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+from lyzr_automata import Agent, Task
+from lyzr_automata.memory.open_ai import OpenAIMemory
+from lyzr_automata.tasks.task_literals import InputType, OutputType
+
+import instrumentation
+from instrumentation import annotate, instrumented, span
+from llm import OpenAIChatModel
+from response_cache import hash_file, make_cache_key, response_cache
+from upload_registry import upload_registry
+
+load_dotenv()
+
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+
+# Roughly 3k tokens of source text per chunk
+CHUNK_SIZE = int(os.getenv("SUMMARY_CHUNK_SIZE", 12000))
+CHUNK_OVERLAP = int(os.getenv("SUMMARY_CHUNK_OVERLAP", 500))
+# Chunk summaries are collapsed in groups until they fit into one reduce call
+REDUCE_MAX_CHARS = int(os.getenv("SUMMARY_REDUCE_MAX_CHARS", 48000))
+MAX_CONCURRENT_SUMMARIES = int(os.getenv("MAX_CONCURRENT_SUMMARIES", 8))
+
+open_ai_model_text = OpenAIChatModel(
+    api_key=OPENAI_API_KEY,
+    parameters={
+        "model": "gpt-4-turbo-preview",
+        "temperature": 0.1,
+        "max_tokens": 1500,
+    },
+)
+
+SUMMARY_PERSONA = """You are a summary generator agent designed to assist with summarizing content from files. The goal is to generate concise and accurate summaries that can be used for content creation, such as slide presentations.
+        Your task is to read the content of the file, identify the key points and main ideas, and generate a summary. The summary should be clear, concise, and well-organized, capturing the essence of the original content.
+        Output - Provide a summarized version of the content. The summary should be divided into sections if the original content is lengthy or complex.
+        Do not include any introductory sentences or closing sentences.
+    """
+
+CHUNK_PERSONA = """You are a summary generator agent designed to assist with summarizing one section of a longer document.
+        Your task is to read the section, identify the key points, facts, examples and main ideas, and generate a detailed summary of it.
+        Do not include any introductory sentences or closing sentences.
+    """
+
+REDUCE_PERSONA = """You are a summary generator agent designed to assist with summarizing content from files. The goal is to generate concise and accurate summaries that can be used for content creation, such as slide presentations.
+        You are given summaries of consecutive sections of one document, in order. Combine them into a single summary that captures the essence of the whole document.
+        Do not include any introductory sentences or closing sentences.
+    """
+
+
+def extract_text(file_path):
+    # Returns None for files we cannot read locally, so callers can fall back
+    # to the file retrieval assistant
+    if file_path.lower().endswith(".pdf"):
+        try:
+            from pypdf import PdfReader
+        except ImportError:
+            return None
+        reader = PdfReader(file_path)
+        return "\n\n".join(page.extract_text() or "" for page in reader.pages)
+
+    try:
+        with open(file_path, "r", encoding="utf-8") as f:
+            return f.read()
+    except UnicodeDecodeError:
+        return None
+
+
+def chunk_text(text, chunk_size=CHUNK_SIZE, overlap=CHUNK_OVERLAP):
+    # Split on paragraph boundaries where possible, hard-splitting paragraphs
+    # that are longer than a chunk. An overlap of a chunk or more would never
+    # advance, so it is capped at half a chunk.
+    overlap = max(0, min(overlap, chunk_size // 2))
+    paragraphs = []
+    for paragraph in text.split("\n\n"):
+        paragraph = paragraph.strip()
+        while len(paragraph) > chunk_size:
+            paragraphs.append(paragraph[:chunk_size])
+            paragraph = paragraph[chunk_size - overlap :]
+        if paragraph:
+            paragraphs.append(paragraph)
+
+    chunks = []
+    current = ""
+    for paragraph in paragraphs:
+        if current and len(current) + len(paragraph) + 2 > chunk_size:
+            chunks.append(current)
+            # Carry over as much of the overlap as fits with the next paragraph
+            keep = min(overlap, chunk_size - len(paragraph) - 2)
+            current = current[-keep:] if keep > 0 else ""
+        current = f"{current}\n\n{paragraph}" if current else paragraph
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _run_task(name, persona, instructions, model):
+    with span("summary_llm_call", task=name) as record:
+        cache_key = make_cache_key(persona, instructions, model.parameters)
+        cached_output = response_cache.get(cache_key)
+        record["cache_hit"] = cached_output is not None
+        if cached_output is not None:
+            return cached_output
+
+        output = Task(
+            name=name,
+            agent=Agent(prompt_persona=persona, role="Summary generation agent"),
+            output_type=OutputType.TEXT,
+            input_type=InputType.TEXT,
+            model=model,
+            instructions=instructions,
+            log_output=True,
+            enhance_prompt=False,
+        ).execute()
+
+    response_cache.set(cache_key, output)
+    return output
+
+
+def summarize_chunks(chunks, model, max_workers=MAX_CONCURRENT_SUMMARIES):
+    def summarize_chunk(indexed_chunk):
+        i, chunk = indexed_chunk
+        return _run_task(
+            f"Summarize Chunk {i + 1}/{len(chunks)} Task",
+            CHUNK_PERSONA,
+            f"Summarize this section of the document. Do not miss any detail. Section: {chunk}",
+            model,
+        )
+
+    max_workers = max(1, min(max_workers, len(chunks)))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            instrumentation.submit(executor, summarize_chunk, indexed_chunk)
+            for indexed_chunk in enumerate(chunks)
+        ]
+        return [future.result() for future in futures]
+
+
+def _collapse_summaries(summaries, model, max_chars=REDUCE_MAX_CHARS):
+    # Merge neighbouring summaries in groups until they fit into one call
+    while len(summaries) > 1 and sum(len(s) for s in summaries) > max_chars:
+        groups = [[]]
+        group_size = 0
+        for summary in summaries:
+            if groups[-1] and group_size + len(summary) > max_chars:
+                groups.append([])
+                group_size = 0
+            groups[-1].append(summary)
+            group_size += len(summary)
+        if len(groups) == len(summaries):
+            # Every summary is already too big to pair up; merge them two by two
+            groups = [summaries[i : i + 2] for i in range(0, len(summaries), 2)]
+        summaries = summarize_chunks(["\n\n".join(group) for group in groups], model)
+    return summaries
+
+
+def reduce_summaries(summaries, model, NUMBER_OF_SLIDES=3):
+    summaries = _collapse_summaries(summaries, model)
+    sections = "\n\n".join(
+        f"Section {i + 1}:\n{summary}" for i, summary in enumerate(summaries)
+    )
+    return _run_task(
+        "Generate Summary Task",
+        REDUCE_PERSONA,
+        f"Summarize the content of the document into {NUMBER_OF_SLIDES} slides. Do not miss any detail. At the end of each slide, append <!END OF SLIDE>. Section summaries: {sections}",
+        model,
+    )
+
+
+def map_reduce_summary(text, model, NUMBER_OF_SLIDES=3):
+    chunks = chunk_text(text)
+    if len(chunks) <= 1:
+        # Small documents go straight to the reduce step
+        return reduce_summaries(chunks, model, NUMBER_OF_SLIDES)
+    return reduce_summaries(summarize_chunks(chunks, model), model, NUMBER_OF_SLIDES)
+
+
+@instrumented("generate_summary")
+def generate_summary(saved_file_path, NUMBER_OF_SLIDES=3):
+    instructions = f"Summarize the content provided in the file into {NUMBER_OF_SLIDES} slides. Do not miss any detail. At the end of each slide, append <!END OF SLIDE>"
+    file_hash = hash_file(saved_file_path)
+    # Everything that shapes the map-reduce output is part of the key, so a
+    # settings change does not keep serving old summaries
+    cache_key = make_cache_key(
+        file_hash,
+        SUMMARY_PERSONA,
+        CHUNK_PERSONA,
+        REDUCE_PERSONA,
+        CHUNK_SIZE,
+        CHUNK_OVERLAP,
+        REDUCE_MAX_CHARS,
+        instructions,
+        open_ai_model_text.parameters,
+    )
+    cached_summary = response_cache.get(cache_key)
+    annotate(cache_hit=cached_summary is not None)
+    if cached_summary is not None:
+        return cached_summary
+
+    document_text = extract_text(saved_file_path)
+    if document_text and document_text.strip():
+        summary = map_reduce_summary(
+            document_text, open_ai_model_text, NUMBER_OF_SLIDES
+        )
+        response_cache.set(cache_key, summary)
+        return summary
+
+    # Formats we cannot read locally go through the file retrieval assistant
+    email_writer_memory = OpenAIMemory(file_path=saved_file_path)
+
+    summary_generation_agent = Agent(
+        prompt_persona=SUMMARY_PERSONA,
+        role="Summary generation agent",
+        memory=email_writer_memory,
+    )
+
+    # Building the Task uploads the file and creates the assistant, unless the
+    # registry already has them for this file
+    with upload_registry.assistant_for(file_hash):
+        summary_generation_task = Task(
+            name="Generate Summary Task",
+            agent=summary_generation_agent,
+            output_type=OutputType.TEXT,
+            input_type=InputType.TEXT,
+            model=open_ai_model_text,
+            instructions=instructions,
+            log_output=True,
+            enhance_prompt=False,
+        )
+    summary_generation_task = summary_generation_task.execute()
+
+    response_cache.set(cache_key, summary_generation_task)
+    return summary_generation_task
+
+
+def split_summary(summarized_content):
+    summary_split_content = summarized_content.split("<!END OF SLIDE>")
+    return [item.strip() for item in summary_split_content if item.strip() != ""]
@@ -0,0 +1,64 @@
+import os
+import sys
+from concurrent.futures import Future
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import fake_backends  # noqa: E402
+from image_store import ImageStore  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def image_url():
+    server = fake_backends.start_in_thread(image_latency=0)
+    yield f"http://127.0.0.1:{server.server_address[1]}/images/{{}}.jpg"
+    server.shutdown()
+
+
+def resolved(url):
+    future = Future()
+    future.set_result(url)
+    return future
+
+
+def test_localize_stores_the_image(tmp_path, image_url):
+    store = ImageStore(store_dir=str(tmp_path))
+    path = store.localize(resolved(image_url.format("a"))).result(timeout=10)
+    assert path.startswith(str(tmp_path)) and os.path.exists(path)
+    assert store.get(image_url.format("a")) == path
+
+
+def test_localize_settles_when_the_index_cannot_be_saved(
+    tmp_path, image_url, monkeypatch
+):
+    store = ImageStore(store_dir=str(tmp_path))
+
+    def fail():
+        raise OSError("disk full")
+
+    monkeypatch.setattr(store, "_save_index", fail)
+    path = store.localize(resolved(image_url.format("b"))).result(timeout=10)
+    assert os.path.exists(path)
+
+
+def test_localize_falls_back_to_the_url_when_the_download_raises(
+    tmp_path, image_url, monkeypatch
+):
+    store = ImageStore(store_dir=str(tmp_path))
+
+    def fail(url, rendition):
+        raise RuntimeError("broken")
+
+    monkeypatch.setattr(store, "_download", fail)
+    url = image_url.format("c")
+    assert store.localize(resolved(url)).result(timeout=10) == url
+    assert store.localize(resolved(None)).result(timeout=10) is None
+
+
+def test_eviction_drops_index_entries(tmp_path, image_url):
+    store = ImageStore(store_dir=str(tmp_path), max_bytes=1)
+    for name in ["d", "e"]:
+        store.fetch(image_url.format(name)).result(timeout=10)
+    assert store._index == {}
@@ -0,0 +1,48 @@
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from instrumentation import (  # noqa: E402
+    deck,
+    metrics,
+    record_usage,
+    span,
+    usage_cost,
+)
+
+
+def usage(prompt_tokens, completion_tokens):
+    return SimpleNamespace(
+        prompt_tokens=prompt_tokens, completion_tokens=completion_tokens
+    )
+
+
+def test_usage_cost():
+    assert usage_cost("gpt-4o", 1_000_000, 0) == pytest.approx(2.50)
+    assert usage_cost("gpt-4-turbo-preview", 0, 1_000_000) == pytest.approx(30.00)
+    assert usage_cost("unknown-model", 1000, 1000) is None
+
+
+def test_cost_is_reported_per_stage_and_deck():
+    with deck() as report:
+        with span("summary_llm_call"):
+            record_usage(usage(1000, 100), "gpt-4-turbo-preview")
+        with span("generate_slide"):
+            record_usage(usage(2000, 400), "gpt-4o")
+            record_usage(usage(2000, 400), "gpt-4o")
+        with span("unpriced"):
+            record_usage(usage(10, 10), "unknown-model")
+
+    summary = report.to_dict()
+    stages = {stage["stage"]: stage for stage in summary["stages"]}
+    assert stages["summary_llm_call"]["cost_usd"] == pytest.approx(0.013)
+    assert stages["generate_slide"]["cost_usd"] == pytest.approx(0.018)
+    assert stages["unpriced"]["cost_usd"] == 0
+    assert summary["cost_usd"] == pytest.approx(0.031)
+
+    line = 'slide_generator_cost_usd_total{stage="generate_slide",model="gpt-4o"}'
+    assert line in metrics.prometheus_text()
@@ -0,0 +1,105 @@
+import os
+import sys
+import time
+
+import httpx
+import openai
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import request_scheduler as request_scheduler_module  # noqa: E402
+from request_scheduler import (  # noqa: E402
+    BATCH,
+    MIN_REQUEST_TIMEOUT,
+    DeadlineExceeded,
+    RequestScheduler,
+    priority,
+    request_timeout,
+)
+
+BUDGETS = {"model": {"requests_per_minute": 60, "tokens_per_minute": 1000}}
+
+
+def make_scheduler(state_dir):
+    return RequestScheduler(
+        budgets=BUDGETS, backoff_base=0.01, state_dir=str(state_dir), poll_interval=0.01
+    )
+
+
+def api_error(error_class, status_code, code):
+    request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+    return error_class(
+        code,
+        response=httpx.Response(status_code, request=request),
+        body={"code": code},
+    )
+
+
+def test_non_retryable_error_returns_the_reservation(tmp_path):
+    scheduler = make_scheduler(tmp_path)
+
+    def rejected():
+        raise api_error(openai.BadRequestError, 400, "invalid_request")
+
+    with pytest.raises(openai.BadRequestError):
+        scheduler.run("model", 600, rejected)
+    scheduler.run("model", 600, lambda: None, deadline=0.5)
+
+
+def test_insufficient_quota_is_not_retried(tmp_path):
+    scheduler = make_scheduler(tmp_path)
+    calls = []
+
+    def out_of_credit():
+        calls.append(1)
+        raise api_error(openai.RateLimitError, 429, "insufficient_quota")
+
+    with pytest.raises(openai.RateLimitError):
+        scheduler.run("model", 10, out_of_credit)
+    assert len(calls) == 1
+
+
+def test_budget_is_shared_through_the_state_dir(tmp_path):
+    first, second = make_scheduler(tmp_path), make_scheduler(tmp_path)
+    first.run("model", 900, lambda: None)
+    with pytest.raises(DeadlineExceeded):
+        second.run("model", 900, lambda: None, deadline=0.2)
+
+
+def test_batch_calls_wait_for_interactive_calls_elsewhere(tmp_path):
+    scheduler = make_scheduler(tmp_path)
+    with scheduler._condition, scheduler._shared("model") as budget:
+        budget.interactive_waiting["-1"] = time.time() + 60
+
+    with priority(BATCH), pytest.raises(DeadlineExceeded):
+        scheduler.run("model", 10, lambda: None, deadline=0.2)
+    scheduler.run("model", 10, lambda: None, deadline=0.2)
+
+
+def test_request_timeout_covers_max_tokens():
+    assert request_timeout(1500) >= MIN_REQUEST_TIMEOUT
+    assert request_timeout(4000) > request_timeout(1500)
+
+
+def test_deadline_fits_two_full_attempts(tmp_path):
+    scheduler = make_scheduler(tmp_path)
+    calls = []
+
+    def slow_then_ok():
+        calls.append(1)
+        if len(calls) == 1:
+            time.sleep(0.3)
+            raise api_error(openai.InternalServerError, 500, "server_error")
+        return "ok"
+
+    assert scheduler.run("model", 10, slow_then_ok, deadline=0.1, timeout=0.3) == "ok"
+    assert len(calls) == 2
+
+
+def test_budgets_stay_per_process_without_fcntl(tmp_path, monkeypatch):
+    monkeypatch.setattr(request_scheduler_module, "fcntl", None)
+    first, second = make_scheduler(tmp_path), make_scheduler(tmp_path)
+    first.run("model", 900, lambda: None)
+    second.run("model", 900, lambda: None, deadline=0.2)
+    assert not os.listdir(tmp_path)
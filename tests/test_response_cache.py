@@ -0,0 +1,29 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import response_cache as response_cache_module  # noqa: E402
+from response_cache import ResponseCache  # noqa: E402
+
+
+def test_set_and_get(tmp_path):
+    cache = ResponseCache(cache_dir=str(tmp_path))
+    assert cache.get("key") is None
+    cache.set("key", "value")
+    assert cache.get("key") == "value"
+    assert cache.stats() == {"hits": 1, "misses": 1}
+
+
+def test_set_survives_entries_evicted_by_another_process(tmp_path, monkeypatch):
+    cache = ResponseCache(cache_dir=str(tmp_path), max_bytes=0)
+    listdir = os.listdir
+
+    # An entry listed here is gone by the time it is looked at
+    monkeypatch.setattr(
+        response_cache_module.os,
+        "listdir",
+        lambda path: listdir(path) + ["evicted.json"],
+    )
+    cache.set("key", "value")
+    assert cache.get("key") is None
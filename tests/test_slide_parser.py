@@ -0,0 +1,93 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.sample_outputs import SAMPLE_SLIDE_OUTPUTS  # noqa: E402
+from slide_parser import (  # noqa: E402
+    SlideStreamParser,
+    add_block,
+    extract_content,
+    split_answer,
+    split_options,
+)
+
+
+def test_split_options():
+    assert split_options("[Java, JavaScript , Python]") == [
+        "Java",
+        "JavaScript",
+        "Python",
+    ]
+    assert split_options("{A, B,}") == ["A", "B"]
+
+
+def test_split_answer_exact_and_listed():
+    options = ["Java", "JavaScript", "Python"]
+    assert split_answer("JavaScript", options) == ["JavaScript"]
+    assert split_answer("{Java, Python}", options) == ["Java", "Python"]
+    assert split_answer("{Java, Python", options) == ["Java", "Python"]
+    assert split_answer("True") == ["True"]
+    assert split_answer("{A, B}") == ["A", "B"]
+
+
+def test_split_answer_matches_whole_options_only():
+    options = ["Java", "JavaScript", "Python"]
+    assert split_answer("{JavaScript and Python}", options) == [
+        "JavaScript",
+        "Python",
+    ]
+    assert split_answer("Option 10", ["1", "2", "10"]) == ["10"]
+    assert split_answer("New York", ["York", "New York"]) == ["New York"]
+
+
+def test_split_answer_falls_back_to_pieces():
+    assert split_answer("{Neither, None}", ["A", "B"]) == ["Neither", "None"]
+
+
+def test_extract_content_pairs_answers_with_options():
+    slide = (
+        "<HEADING> Languages </HEADING>"
+        "<QUESTION>Q1</QUESTION><OPTIONS>[Java, JavaScript]</OPTIONS>"
+        "<ANSWER>{JavaScript}</ANSWER>"
+        "<question>Q2</question><OPTIONS>[1, 10]</OPTIONS><ANSWER>Option 10"
+        "<IMAGE>{a laptop}</IMAGE>"
+    )
+    assert extract_content(slide) == {
+        "HEADING": "Languages",
+        "IMAGE": "a laptop",
+        "QUESTION": ["Q1", "Q2"],
+        "OPTIONS": [["Java", "JavaScript"], ["1", "10"]],
+        "ANSWER": [["JavaScript"], ["10"]],
+    }
+
+
+def test_extract_content_matches_streaming_parser():
+    for sample in SAMPLE_SLIDE_OUTPUTS:
+        content = sample["generated_content"]
+        parser = SlideStreamParser()
+        blocks = []
+        for i in range(0, len(content), 7):
+            blocks += parser.feed(content[i : i + 7])
+        blocks += parser.close()
+
+        extracted = extract_content(content)
+        for tag, block in blocks:
+            if tag in ("HEADING", "TEXT"):
+                assert extracted[tag] == block
+        questions = [block for tag, block in blocks if tag == "QUESTION"]
+        assert extracted.get("QUESTION", []) == questions
+
+
+def test_extract_content_matches_add_block():
+    slides = [sample["generated_content"] for sample in SAMPLE_SLIDE_OUTPUTS] + [
+        "<heading>Lower</heading><TEXT>a < b</TEXT></HEADING> stray"
+        "<QUESTION>Q<OPTIONS>[A , B,]</OPTIONS><ANSWER>{A and B}</ANSWER>"
+        "<ANSWER>Extra</ANSWER><IMAGE>{}</IMAGE>< image >{cat}"
+    ]
+    for slide in slides:
+        parser = SlideStreamParser()
+        record = {}
+        for tag, content in parser.feed(slide) + parser.close():
+            add_block(record, tag, content)
+        assert extract_content(slide) == record
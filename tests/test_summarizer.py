@@ -0,0 +1,32 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Importing the summarizer builds its OpenAI clients, which need a key
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+from summarizer import chunk_text  # noqa: E402
+
+TEXT = "\n\n".join(
+    " ".join(f"word{i}-{j}" for j in range(i % 7 * 20 + 1)) for i in range(60)
+)
+
+
+def test_chunks_stay_within_chunk_size():
+    for chunk_size, overlap in [(200, 0), (200, 50), (500, 100), (1000, 500)]:
+        chunks = chunk_text(TEXT, chunk_size, overlap)
+        assert chunks
+        assert all(len(chunk) <= chunk_size for chunk in chunks)
+
+
+def test_overlap_of_a_chunk_or_more_still_advances():
+    for overlap in [200, 1000]:
+        chunks = chunk_text(TEXT, 200, overlap)
+        assert all(len(chunk) <= 200 for chunk in chunks)
+        assert chunks[-1].endswith(TEXT[-20:])
+
+
+def test_chunks_cover_the_text():
+    chunks = chunk_text(TEXT, 300, 50)
+    for paragraph in TEXT.split("\n\n"):
+        assert any(paragraph[:100] in chunk for chunk in chunks)
@@ -0,0 +1,57 @@
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from upload_registry import UploadRegistry  # noqa: E402
+
+
+def make_registry(tmp_path, **kwargs):
+    # One per process sharing the files, as the app and the service do
+    return UploadRegistry(
+        registry_file=str(tmp_path / "upload_registry.json"),
+        uploads_dir=str(tmp_path / "uploads"),
+        agents_file=str(tmp_path / "assistant_ids.json"),
+        **kwargs,
+    )
+
+
+def test_processes_keep_each_others_entries(tmp_path):
+    app, service = make_registry(tmp_path), make_registry(tmp_path)
+    _, service_hash = service.save_upload("b.txt", b"service document")
+    with service.assistant_for(service_hash):
+        # What lyzr_automata writes once it has set up the assistant
+        with open(service.agents_file, "w") as f:
+            json.dump({"assistant_id": "asst_b", "file_id": "file_b"}, f)
+
+    _, app_hash = app.save_upload("a.txt", b"app document")
+
+    saved = make_registry(tmp_path)._load()
+    assert saved[service_hash]["assistant_id"] == "asst_b"
+    assert app_hash in saved
+
+    # The app reuses the assistant the service set up
+    with app.assistant_for(service_hash):
+        with open(app.agents_file) as f:
+            assert json.load(f)["assistant_id"] == "asst_b"
+
+
+def test_expired_entries_stay_expired(tmp_path):
+    app = make_registry(tmp_path)
+    service = make_registry(tmp_path, ttl=-1)
+    app.save_upload("a.txt", b"document")
+    service.expire()
+    app.save_upload("b.txt", b"other document")
+    assert len(make_registry(tmp_path)._load()) == 1
+
+
+def test_works_without_fcntl(tmp_path, monkeypatch):
+    import upload_registry
+
+    monkeypatch.setattr(upload_registry, "fcntl", None)
+    registry = make_registry(tmp_path)
+    _, file_hash = registry.save_upload("a.txt", b"document")
+    with registry.assistant_for(file_hash):
+        pass
+    assert file_hash in make_registry(tmp_path)._load()
@@ -0,0 +1,176 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from openai import OpenAI
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: no flock, so only threads within a process are serialized
+    fcntl = None
+
+# lyzr_automata's FileRetrievalAssistant loads and saves its ids here
+AGENTS_FILE = "assistant_ids.json"
+UPLOADS_DIR = "uploads"
+UPLOAD_REGISTRY_FILE = os.getenv("UPLOAD_REGISTRY_FILE", "upload_registry.json")
+UPLOAD_REGISTRY_TTL = int(os.getenv("UPLOAD_REGISTRY_TTL", 7 * 24 * 60 * 60))
+
+logger = logging.getLogger(__name__)
+
+
+@contextmanager
+def _file_lock(path):
+    # Exclusive across processes for as long as the block runs
+    if fcntl is None:
+        yield
+        return
+    with open(path, "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class UploadRegistry:
+    # Maps the sha256 of an uploaded file to its saved path and to the OpenAI
+    # file and assistant created for it, so identical uploads skip the write,
+    # the file upload and the assistant setup.
+    def __init__(
+        self,
+        registry_file=UPLOAD_REGISTRY_FILE,
+        ttl=UPLOAD_REGISTRY_TTL,
+        uploads_dir=UPLOADS_DIR,
+        agents_file=AGENTS_FILE,
+    ):
+        self.registry_file = registry_file
+        self.ttl = ttl
+        self.uploads_dir = uploads_dir
+        self.agents_file = agents_file
+        self._lock = threading.RLock()
+        # The ids file is global, so only one assistant can be set up at a time
+        # in this process, and the lock file does the same across processes
+        self._assistant_lock = threading.Lock()
+        self._entries = self._load() or {}
+
+    def _load(self):
+        try:
+            with open(self.registry_file, "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except json.JSONDecodeError:
+            return None
+
+    def _save(self):
+        # The pid keeps processes from writing the same tmp file
+        tmp_path = f"{self.registry_file}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self._entries, f, indent=2)
+        os.replace(tmp_path, self.registry_file)
+
+    @contextmanager
+    def _update(self):
+        # Every change goes through here, so the Streamlit app and the service
+        # never drop each other's entries: under the file lock the registry is
+        # re-read and merged per hash, the caller changes self._entries, and
+        # the result is saved. Entries missing from the file were expired by
+        # another process.
+        with self._lock, _file_lock(f"{self.registry_file}.lock"):
+            saved = self._load()
+            if saved is not None:
+                self._entries = {
+                    content_hash: {**self._entries.get(content_hash, {}), **entry}
+                    for content_hash, entry in saved.items()
+                }
+            yield self._entries
+            self._save()
+
+    def save_upload(self, file_name, data):
+        content_hash = hashlib.sha256(data).hexdigest()
+        with self._update() as entries:
+            entry = entries.setdefault(content_hash, {})
+            entry["last_used"] = time.time()
+            saved_path = entry.get("saved_path")
+            if saved_path is None or not os.path.exists(saved_path):
+                # Prefix the hash so same-named files with different content
+                # do not overwrite each other
+                os.makedirs(self.uploads_dir, exist_ok=True)
+                saved_path = os.path.join(
+                    self.uploads_dir, f"{content_hash[:16]}_{file_name}"
+                )
+                with open(saved_path, "wb") as f:
+                    f.write(data)
+                entry["saved_path"] = saved_path
+        return saved_path, content_hash
+
+    @contextmanager
+    def assistant_for(self, content_hash):
+        # Wrap the construction of an OpenAIMemory backed Task: the stored ids
+        # for this file are handed to lyzr_automata through the ids file, and
+        # whatever it creates is recorded back under the file's hash
+        with self._assistant_lock, _file_lock(f"{self.agents_file}.lock"):
+            # Another process may have set up this file's assistant
+            with self._update() as entries:
+                entry = dict(entries.get(content_hash, {}))
+
+            if entry.get("assistant_id") and entry.get("file_id"):
+                ids = {
+                    "assistant_id": entry["assistant_id"],
+                    "file_id": entry["file_id"],
+                    "thread_id": None,
+                }
+                with open(self.agents_file, "w") as f:
+                    json.dump(ids, f)
+            elif os.path.exists(self.agents_file):
+                # Never let a new file pick up another file's assistant
+                os.remove(self.agents_file)
+
+            yield
+
+            try:
+                with open(self.agents_file, "r") as f:
+                    ids = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                return
+            with self._update() as entries:
+                entry = entries.setdefault(content_hash, {})
+                entry["assistant_id"] = ids.get("assistant_id")
+                entry["file_id"] = ids.get("file_id")
+                entry["last_used"] = time.time()
+
+    def expire(self):
+        now = time.time()
+        with self._update() as entries:
+            expired = {
+                content_hash: entry
+                for content_hash, entry in entries.items()
+                if now - entry.get("last_used", 0) > self.ttl
+            }
+            for content_hash in expired:
+                del entries[content_hash]
+
+        for entry in expired.values():
+            if entry.get("saved_path") and os.path.exists(entry["saved_path"]):
+                os.remove(entry["saved_path"])
+            self._delete_remote(entry)
+
+    def _delete_remote(self, entry):
+        if not (entry.get("assistant_id") or entry.get("file_id")):
+            return
+        try:
+            client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+            if entry.get("assistant_id"):
+                client.beta.assistants.delete(entry["assistant_id"])
+            if entry.get("file_id"):
+                client.files.delete(entry["file_id"])
+        except Exception as e:
+            logger.warning("Could not clean up expired OpenAI objects %s: %s", entry, e)
+
+
+upload_registry = UploadRegistry()